@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compare the streaming cue-table parser and vectorized merge with the regex/dict implementation,
+and measure how much text collapsing rolling auto-captions removes"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.cues import parse_cues
+from utils.subtitles import _merge_subtitle_dicts, merge_cue_table, normalize_auto_captions
+
+WORDS = ["the", "video", "shows", "how", "we", "build", "a", "small", "robot", "today",
+         "and", "then", "it", "moves", "around", "Next", "This", "Finally", "we", "test"]
+
+def legacy_parse_vtt(subtitle_file):
+    """The whole-file DOTALL regex parser that CueTable replaced"""
+    with open(subtitle_file, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    pattern = re.compile(r'(\d{2}:\d{2}:\d{2}\.\d{3}) --> (\d{2}:\d{2}:\d{2}\.\d{3})\n(.*?)\n\n', re.DOTALL)
+    return [
+        {'index': index + 1, 'start': start.replace('.', ','), 'end': end.replace('.', ','),
+         'text': text.replace('\n', ' ')}
+        for index, (start, end, text) in enumerate(pattern.findall(content))
+    ]
+
+def write_vtt(path, count, seed=0):
+    """Write a synthetic VTT file with count cues of varying length and spacing"""
+    rng = np.random.default_rng(seed)
+    position = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for _ in range(count):
+            start = position + int(rng.integers(0, 800))
+            end = start + int(rng.integers(600, 4000))
+            position = end
+            words = rng.choice(WORDS, size=int(rng.integers(3, 12)))
+            text = " ".join(words) + ("." if rng.random() < 0.4 else "")
+            f.write(f"{_vtt_time(start)} --> {_vtt_time(end)}\n{text}\n\n")
+
+def write_rolling_vtt(path, lines, seed=0):
+    """Write synthetic YouTube-style auto-captions: each line is shown with word timings,
+    then repeated above the next line, with a 10 ms transition cue in between"""
+    rng = np.random.default_rng(seed)
+    position = 0
+    previous = " "
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\nKind: captions\nLanguage: en\n\n")
+        for _ in range(lines):
+            words = [str(word).lower() for word in rng.choice(WORDS, size=int(rng.integers(4, 9)))]
+            step = int(rng.integers(250, 450))
+            end = position + step * len(words)
+            timed = words[0] + "".join(f"<{_vtt_time(position + step * i)}><c> {word}</c>"
+                                       for i, word in enumerate(words[1:], 1))
+            f.write(f"{_vtt_time(position)} --> {_vtt_time(end)} align:start position:0%\n{previous}\n{timed}\n\n")
+            previous = " ".join(words)
+            f.write(f"{_vtt_time(end)} --> {_vtt_time(end + 10)} align:start position:0%\n{previous}\n \n\n")
+            position = end + 10
+
+def _vtt_time(milliseconds):
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def timed(function, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Cue parsing and merging benchmark")
+    parser.add_argument("--cues", type=int, default=20000, help="Number of synthetic cues (default: 20000)")
+    args = parser.parse_args()
+
+    config = Config(work_dir=tempfile.mkdtemp(prefix="bench_cues_"))
+    subtitle_file = os.path.join(config.subtitles_path, "bench.vtt")
+    write_vtt(subtitle_file, args.cues)
+
+    legacy_parse_time, legacy_subtitles = timed(legacy_parse_vtt, subtitle_file)
+    parse_time, cues = timed(parse_cues, subtitle_file)
+    legacy_merge_time, legacy_merged = timed(_merge_subtitle_dicts, legacy_subtitles, config, None)
+    merge_time, merged = timed(merge_cue_table, cues, config)
+    serialize_time, merged_dicts = timed(merged.to_dicts)
+
+    print(f"{args.cues} cues")
+    print(f"  parse:  regex {legacy_parse_time * 1000:8.1f} ms   cue table {parse_time * 1000:8.1f} ms")
+    print(f"  merge:  dicts {legacy_merge_time * 1000:8.1f} ms   cue table {merge_time * 1000:8.1f} ms"
+          f"   (+{serialize_time * 1000:.1f} ms to serialize)")
+    # The dict merge compares float seconds, so a pause of exactly the merge threshold can go either way
+    matching = sum(a == b for a, b in zip(merged_dicts, legacy_merged))
+    print(f"  merged cues: {len(merged_dicts)} (dict merge: {len(legacy_merged)}), {matching} identical")
+
+    rolling_file = os.path.join(config.subtitles_path, "bench_rolling.vtt")
+    write_rolling_vtt(rolling_file, args.cues // 2)
+    rolling = parse_cues(rolling_file)
+    normalize_time, normalized = timed(normalize_auto_captions, rolling)
+    rolling_words = sum(len(re.sub(r"<[^>]*>", "", text).split()) for text in rolling.texts)
+    normalized_words = sum(len(text.split()) for text in normalized.texts)
+    print(f"{len(rolling)} rolling auto-caption cues")
+    print(f"  normalize: {normalize_time * 1000:.1f} ms -> {len(normalized)} cues, "
+          f"{normalized_words} of {rolling_words} words kept")
+
+if __name__ == "__main__":
+    main()
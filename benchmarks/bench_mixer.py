@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Streaming mixer throughput and memory: ducking and loudness targeting over synthetic tracks of growing length"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mixer import mix_blocks
+from utils.wav import WavReader, WavWriter
+
+# One synthetic cue of speech every few seconds
+SECONDS_PER_CUE = 3
+SPEECH_SECONDS = 2
+
+def write_background(path, seconds, sample_rate, seed=0):
+    """Stereo noise with a slow swell, written ten seconds at a time"""
+    rng = np.random.default_rng(seed)
+    with WavWriter(path, sample_rate, 2) as writer:
+        for start in range(0, seconds * sample_rate, 10 * sample_rate):
+            t = np.arange(start, min(start + 10 * sample_rate, seconds * sample_rate)) / sample_rate
+            swell = 0.5 + 0.5 * np.sin(2 * np.pi * t / 30)
+            writer.write((0.1 * swell[:, None] * rng.standard_normal((len(t), 2))).astype(np.float32))
+    return path
+
+def write_speech(path, seconds, sample_rate):
+    """Mono tone bursts, one per cue, and their (start, end) intervals"""
+    burst = 0.3 * np.sin(2 * np.pi * 180 * np.arange(SPEECH_SECONDS * sample_rate) / sample_rate)
+    gap = np.zeros((SECONDS_PER_CUE - SPEECH_SECONDS) * sample_rate)
+    cue = np.concatenate([burst, gap]).astype(np.float32)
+    intervals = []
+    with WavWriter(path, sample_rate, 1) as writer:
+        for start in range(0, seconds, SECONDS_PER_CUE):
+            writer.write(cue)
+            intervals.append((start, start + SPEECH_SECONDS))
+    return path, intervals
+
+def run_one(minutes, sample_rate, bg_rate, block_seconds, work_dir):
+    seconds = int(minutes * 60)
+    bg_file = write_background(os.path.join(work_dir, "background.wav"), seconds, bg_rate)
+    speech_file, intervals = write_speech(os.path.join(work_dir, "speech.wav"), seconds, sample_rate)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    start = time.perf_counter()
+    frames = 0
+    with WavReader(speech_file) as speech, WavReader(bg_file) as background:
+        for block in mix_blocks(speech, background, intervals, sample_rate, block_seconds=block_seconds):
+            frames += len(block)
+    elapsed = time.perf_counter() - start
+    return {
+        "minutes": minutes,
+        "seconds": elapsed,
+        "realtime": frames / sample_rate / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_before_mix_mb": rss_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming mixer benchmark: x-realtime and peak memory by duration")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60, 180], help="Track lengths (default: 10 60 180)")
+    parser.add_argument("--sample-rate", type=int, default=48000, help="Speech and output rate")
+    parser.add_argument("--bg-rate", type=int, default=44100, help="Background rate; differing rates exercise resampling")
+    parser.add_argument("--block-seconds", type=float, default=10.0)
+    parser.add_argument("--work-dir", default=None, help="Where the synthetic WAVs are written (default: a temporary directory)")
+    parser.add_argument("--one", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        # Child mode: peak RSS is per process, so every duration runs in a fresh one
+        print(json.dumps(run_one(args.minutes[0], args.sample_rate, args.bg_rate, args.block_seconds, args.work_dir)))
+        return
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench_mixer_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        for minutes in args.minutes:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--one", "--minutes", str(minutes),
+                 "--sample-rate", str(args.sample_rate), "--bg-rate", str(args.bg_rate),
+                 "--block-seconds", str(args.block_seconds), "--work-dir", work_dir],
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{minutes:>6.0f} min: {result['seconds']:7.2f}s  {result['realtime']:8.1f}x realtime  "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB ({result['rss_before_mix_mb']:.1f} MB before mixing)")
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
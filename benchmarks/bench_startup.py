@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Measure CLI startup time and check that no heavy backend is imported on paths that do not use it"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DUBBER = os.path.join(REPO, "dubber.py")
+
+# Backends that only the stages using them may import
+HEAVY_MODULES = ("torch", "torchaudio", "demucs", "yt_dlp", "googletrans", "google.genai")
+
+def run(command, repeat):
+    """Median wall time of a command and the heavy modules its last run imported"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime"] + command,
+                                cwd=REPO, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append(time.perf_counter() - start)
+    imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines()
+                if line.startswith("import time:")}
+    return statistics.median(times), sorted(imported & set(HEAVY_MODULES))
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (default: 5)")
+    parser.add_argument("--max-seconds", type=float, default=1.0,
+                        help="Fail when a scenario's median startup exceeds this (default: 1.0)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    scenarios = {
+        "--help": [DUBBER, "--help"],
+        # With no recorded stage outputs the rerun finds no speech files and stops right away
+        "--start-step AudioVideoGenerator": [DUBBER, "https://www.youtube.com/watch?v=NLtnm_bRzPw",
+                                             "--work-dir", work_dir, "--start-step", "AudioVideoGenerator"],
+    }
+
+    failed = False
+    for name, command in scenarios.items():
+        seconds, heavy = run(command, args.repeat)
+        status = "ok"
+        if heavy or seconds > args.max_seconds:
+            status = "FAIL"
+            failed = True
+        print(f"{name:<36} {seconds * 1000:8.1f} ms   heavy imports: {', '.join(heavy) or 'none':<20} {status}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
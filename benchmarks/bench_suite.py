@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Offline benchmark suite: synthetic media, stand-in backends and JSON results checked against thresholds"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from pipeline import Pipeline
+from processors.audio_extractor import AudioExtractor
+from processors.audio_video_generator import AudioVideoGenerator
+from processors.subtitle_processor import SubtitleProcessor
+from processors.translator import TranslationProcessor
+from processors.tts import TTSProcessor
+from utils.audio import create_adjusted_audio_video
+from utils.subtitles import merge_subtitle_segments, parse_vtt
+from utils.tts import get_tts_system
+from utils.translation import get_translator
+from utils.video import extract_audio
+
+from stand_ins import register_stand_ins
+from synthetic import SCALES, make_video, write_vtt
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+# One synthetic cue every few seconds of media in the end-to-end runs
+SECONDS_PER_CUE = 3
+
+def timed(function, *args, repeat=1):
+    """Best wall time of repeat calls and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def make_config(work_dir, backend, video_file):
+    config = Config(work_dir=work_dir)
+    config.default_translation = backend
+    config.default_tts = backend
+    config.audio_separator = backend
+    config.video_file = video_file
+    config.incremental = False
+    config.enable_segment_merging = True
+    config.translation_cache_enabled = False
+    config.tts_cache_enabled = False
+    return config
+
+def bench_cues(results, work_dir, counts, duration):
+    for count in counts:
+        config = Config(work_dir=work_dir)
+        subtitle_file = write_vtt(os.path.join(work_dir, f"cues_{count}.vtt"), count, duration)
+        seconds, subtitles = timed(parse_vtt, subtitle_file, repeat=3)
+        results[f"parse_vtt/{count}"] = {"seconds": seconds, "cues": len(subtitles)}
+        seconds, merged = timed(merge_subtitle_segments, subtitles, config, repeat=3)
+        results[f"merge_subtitle_segments/{count}"] = {"seconds": seconds, "cues": len(merged)}
+        print(f"  {count:>6} cues: parse {results[f'parse_vtt/{count}']['seconds'] * 1000:8.1f} ms, "
+              f"merge {seconds * 1000:8.1f} ms")
+
+def bench_scale(results, work_dir, media_dir, scale, backend):
+    duration = SCALES[scale]
+    video_file = make_video(os.path.join(media_dir, f"synthetic_{scale}.mp4"), duration)
+    subtitle_file = write_vtt(os.path.join(media_dir, f"synthetic_{scale}.vtt"), duration // SECONDS_PER_CUE, duration)
+
+    # Assembly alone, from clips the stand-in TTS has already written
+    config = make_config(os.path.join(work_dir, f"assembly_{scale}"), backend, video_file)
+    extract_audio(config, video_file)
+    config.bg_file = config.original_audio_file
+    subtitles = merge_subtitle_segments(parse_vtt(subtitle_file), config)
+    speech_files = get_tts_system(backend, config).generate(get_translator(backend, config).translate(subtitles))
+    seconds, output = timed(create_adjusted_audio_video, config, speech_files)
+    results[f"create_adjusted_audio_video/{scale}"] = {"seconds": seconds, "clips": len(speech_files),
+                                                       "media_seconds": duration, "ok": output is not None}
+    print(f"  {scale}: create_adjusted_audio_video {seconds:7.2f}s for {len(speech_files)} clips")
+
+    # Every stage after the download, as Pipeline.run drives them
+    for mode in ("sequential", "streaming"):
+        config = make_config(os.path.join(work_dir, f"pipeline_{scale}_{mode}"), backend, video_file)
+        config.pipeline_mode = mode
+        processors = [cls(config) for cls in (AudioExtractor, SubtitleProcessor, TranslationProcessor,
+                                              TTSProcessor, AudioVideoGenerator)]
+        data = {"subtitle_file": subtitle_file, "video_file": video_file, "audio_source": video_file}
+        seconds, result = timed(Pipeline(config, processors).run, data)
+        results[f"pipeline_{mode}/{scale}"] = {"seconds": seconds, "media_seconds": duration,
+                                               "ok": bool(result.get("output_video"))}
+        print(f"  {scale}: Pipeline.run ({mode}) {seconds:7.2f}s, "
+              f"{duration / seconds:6.1f}x realtime")
+
+def check_thresholds(results, thresholds):
+    """Names of results that failed or took longer than their threshold in seconds"""
+    failures = []
+    for name, limit in thresholds.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if not result.get("ok", True) or result["seconds"] > limit:
+            failures.append(f"{name}: {result['seconds']:.3f}s (limit {limit}s, ok={result.get('ok', True)})")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with synthetic media and stand-in backends")
+    parser.add_argument("--scales", nargs="*", default=["10m"], choices=sorted(SCALES),
+                        help="Media lengths to run end to end (default: 10m)")
+    parser.add_argument("--cues", nargs="*", type=int, default=[100, 1000, 5000, 20000],
+                        help="Cue counts for the parsing and merging benchmarks")
+    parser.add_argument("--media-dir", default=None, help="Keep generated videos here to reuse them across runs")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results file (default: benchmark_results.json)")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS,
+                        help="JSON file mapping result names to maximum seconds; exceeding one exits with status 1")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="dubber_bench_")
+    media_dir = args.media_dir or os.path.join(work_dir, "media")
+    backend = register_stand_ins()
+    results = {}
+    try:
+        print("Cue parsing and merging")
+        bench_cues(results, work_dir, args.cues, SCALES["3h"])
+        if args.scales and shutil.which("ffmpeg") is None:
+            print("ffmpeg not found; skipping the assembly and pipeline benchmarks")
+        else:
+            for scale in args.scales:
+                print(f"Media scale {scale}")
+                bench_scale(results, work_dir, media_dir, scale, backend)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            failures = check_thresholds(results, json.load(f))
+        for failure in failures:
+            print(f"Threshold exceeded: {failure}")
+        if failures:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare the in-process WSOLA time-stretcher with the ffmpeg atempo path"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio import adjust_audio_timing
+from utils.timestretch import time_stretch_batch
+from utils.wav import read_wav_info, write_wav
+
+def make_clips(count, sample_rate, seed=0):
+    """Synthetic speech-like clips: harmonic tones with a syllable-rate envelope and some noise"""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for _ in range(count):
+        duration = rng.uniform(0.8, 6.0)
+        t = np.arange(int(duration * sample_rate)) / sample_rate
+        pitch = rng.uniform(90, 250) * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(h * phase) / h for h in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2
+        noise = 0.05 * rng.standard_normal(len(t))
+        clips.append((0.2 * voice * envelope + noise).astype(np.float32))
+    speed_factors = list(rng.uniform(0.75, 1.9, count))
+    return clips, speed_factors
+
+def length_errors_ms(lengths, clips, speed_factors, sample_rate):
+    expected = np.array([len(clip) / speed for clip, speed in zip(clips, speed_factors)])
+    return np.abs(np.array(lengths) - expected) / sample_rate * 1000
+
+def report(label, elapsed, audio_seconds, errors):
+    print(f"{label:>9}: {elapsed:7.2f}s  {audio_seconds / elapsed:8.1f}x realtime  "
+          f"length error mean {errors.mean():6.2f} ms, max {errors.max():6.2f} ms")
+
+def bench_wsola(clips, speed_factors, sample_rate, workers):
+    start = time.perf_counter()
+    stretched = time_stretch_batch(clips, speed_factors, workers=workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, length_errors_ms([len(clip) for clip in stretched], clips, speed_factors, sample_rate)
+
+def bench_ffmpeg(clips, speed_factors, sample_rate):
+    work_dir = tempfile.mkdtemp(prefix="bench_timestretch_")
+    try:
+        paths = []
+        for i, clip in enumerate(clips):
+            path = os.path.join(work_dir, f"clip_{i}.wav")
+            write_wav(path, clip, sample_rate)
+            paths.append(path)
+
+        start = time.perf_counter()
+        outputs = [
+            adjust_audio_timing(path, 0, len(clip) / sample_rate, speed)
+            for path, clip, speed in zip(paths, clips, speed_factors)
+        ]
+        elapsed = time.perf_counter() - start
+        lengths = [read_wav_info(path)[2] for path in outputs]
+        return elapsed, length_errors_ms(lengths, clips, speed_factors, sample_rate)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-stretch benchmark: WSOLA vs ffmpeg atempo")
+    parser.add_argument("--clips", type=int, default=200, help="Number of synthetic clips (default: 200)")
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="WSOLA threads")
+    parser.add_argument("--skip-ffmpeg", action="store_true", help="Only benchmark the in-process stretcher")
+    args = parser.parse_args()
+
+    clips, speed_factors = make_clips(args.clips, args.sample_rate)
+    audio_seconds = sum(len(clip) for clip in clips) / args.sample_rate
+    print(f"{len(clips)} clips, {audio_seconds:.1f}s of audio at {args.sample_rate} Hz")
+
+    for workers in sorted({1, args.workers}):
+        elapsed, errors = bench_wsola(clips, speed_factors, args.sample_rate, workers)
+        report(f"wsola x{workers}", elapsed, audio_seconds, errors)
+
+    if args.skip_ffmpeg or shutil.which("ffmpeg") is None:
+        print("Skipping ffmpeg atempo benchmark")
+        return
+    elapsed, errors = bench_ffmpeg(clips, speed_factors, args.sample_rate)
+    report("atempo", elapsed, audio_seconds, errors)
+
+if __name__ == "__main__":
+    main()
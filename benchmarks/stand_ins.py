@@ -0,0 +1,82 @@
+"""Deterministic offline stand-ins for the translation, TTS and separation backends"""
+import os
+import zlib
+import numpy as np
+
+from utils.speech_rate import DEFAULT_INTERCEPT, DEFAULT_SECONDS_PER_CHAR
+from utils.translation import register_translator
+from utils.tts import register_tts_system
+from utils.video import register_separator
+from utils.wav import WavReader, WavWriter, write_wav
+
+STAND_IN = "bench"
+
+class EchoTranslator:
+    """Translates by reversing every word, which keeps text lengths and cue timing realistic"""
+    def __init__(self, config):
+        self.config = config
+
+    def translate(self, subtitles):
+        return [
+            {
+                'index': subtitle['index'],
+                'start': subtitle['start'],
+                'end': subtitle['end'],
+                'text': ' '.join(word[::-1] for word in subtitle['text'].split()),
+                'orig_text': subtitle['text'],
+            }
+            for subtitle in subtitles
+        ]
+
+class ToneTTS:
+    """Speaks each cue as a tone lasting as long as the default speech rate model predicts"""
+    def __init__(self, config):
+        self.config = config
+        self.sample_rate = config.sample_rate
+
+    def _speak(self, subtitle):
+        duration = DEFAULT_INTERCEPT + DEFAULT_SECONDS_PER_CHAR * len(subtitle['text'])
+        t = np.arange(int(duration * self.sample_rate)) / self.sample_rate
+        # The pitch only depends on the text, so repeated runs write identical clips
+        pitch = 120 + zlib.crc32(subtitle['text'].encode("utf-8")) % 120
+        samples = (0.2 * np.sin(2 * np.pi * pitch * t)).astype(np.float32)
+        path = os.path.join(self.config.tts_path, f"speech_{subtitle['index']}.wav")
+        write_wav(path, samples, self.sample_rate)
+        return {
+            'file': path,
+            'start': subtitle['start'],
+            'end': subtitle['end'],
+            'text': subtitle['text'],
+            'orig_text': subtitle.get('orig_text', subtitle['text']),
+            'num_samples': len(samples),
+            'sample_rate': self.sample_rate,
+            'prosody': "medium",
+            'cached': False,
+        }
+
+    def generate(self, translated_subtitles):
+        return [self._speak(subtitle) for subtitle in translated_subtitles]
+
+    def generate_stream(self, translated_subtitles):
+        for subtitle in translated_subtitles:
+            yield self._speak(subtitle)
+
+def split_in_half(config, subtitle_file=None):
+    """Stream the original audio into a voice and a background file at half level each"""
+    block_frames = 10 * 48000
+    with WavReader(config.original_audio_file) as reader, \
+            WavWriter(config.voice_file, reader.sample_rate, reader.channels) as voice_writer, \
+            WavWriter(config.bg_file, reader.sample_rate, reader.channels) as bg_writer:
+        for start in range(0, reader.num_frames, block_frames):
+            block = reader.read(start, block_frames) * 0.5
+            voice_writer.write(block)
+            bg_writer.write(block)
+    return config.voice_file, config.bg_file
+
+def register_stand_ins():
+    """Register the stand-ins under one name and return it, for the default_translation,
+    default_tts and audio_separator config fields"""
+    register_translator(STAND_IN, EchoTranslator)
+    register_tts_system(STAND_IN, ToneTTS)
+    register_separator(STAND_IN, split_in_half)
+    return STAND_IN
@@ -0,0 +1,48 @@
+"""Synthetic inputs for the offline benchmarks: a small video with a tone-and-noise soundtrack and VTT files"""
+import os
+import subprocess
+import numpy as np
+
+WORDS = ["the", "video", "shows", "how", "we", "build", "a", "small", "robot", "today",
+         "and", "then", "it", "moves", "around", "Next", "This", "Finally", "we", "test"]
+
+# Named media lengths in seconds
+SCALES = {"10m": 600, "1h": 3600, "3h": 3 * 3600}
+
+def _vtt_time(milliseconds):
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def write_vtt(path, count, duration, seed=0):
+    """Write count cues spread over duration seconds, with sentence breaks and pauses of varying length"""
+    rng = np.random.default_rng(seed)
+    slot = duration * 1000 // max(1, count)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for i in range(count):
+            start = i * slot + int(rng.integers(0, max(1, slot // 5)))
+            end = start + int(slot * rng.uniform(0.5, 0.8))
+            words = rng.choice(WORDS, size=int(rng.integers(3, 12)))
+            text = " ".join(words) + ("." if rng.random() < 0.4 else "")
+            f.write(f"{_vtt_time(start)} --> {_vtt_time(end)}\n{text}\n\n")
+    return path
+
+def make_video(path, duration, sample_rate=44100):
+    """Encode a tiny one-frame-per-second video whose soundtrack is a tone over pink noise"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    command = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"color=c=black:s=160x90:r=1:d={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate={sample_rate}:duration={duration}",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.05:sample_rate={sample_rate}:duration={duration}",
+        "-filter_complex", "[1:a][2:a]amix=inputs=2:duration=shortest[a]",
+        "-map", "0:v", "-map", "[a]",
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage",
+        "-c:a", "aac", "-b:a", "64k", "-shortest", path,
+    ]
+    subprocess.run(command, check=True)
+    return path
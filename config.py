@@ -1,13 +1,30 @@
+import copy
 import os
 
 class Config:
-    def __init__(self, youtube_url=None, target_language="tt", work_dir="downloads"):
+    def __init__(self, youtube_url=None, target_language="tt", work_dir="downloads", target_languages=None):
         self.youtube_url = youtube_url
         self.target_language = target_language
+        # Dubbing into several languages shares download, separation and subtitle parsing
+        self.target_languages = list(target_languages) if target_languages else [target_language]
         self.work_dir = work_dir
+        self.mux_video = True  # Per-language configs of a multi-language run only produce an audio track
         
+        # Download options
+        self.audio_first_download = True  # Fetch subtitles and audio first; the video downloads in the background
+        self.download_fragments = 8  # Fragments of a stream downloaded concurrently
+
         #Audio separator options
         self.audio_separator = "demucs"  # Options: "demucs" or "spleeter"
+        self.demucs_backend = "inprocess"  # Options: "inprocess" (warm model, chunked) or "cli" (python -m demucs.separate)
+        self.demucs_model = "htdemucs"
+        self.separation_chunk_seconds = 30  # Audio separated at a time; bounds memory on long videos
+        self.separation_overlap_seconds = 1.0  # Crossfaded overlap between neighbouring chunks
+        self.separation_workers = 1  # Separation worker processes; more than 1 spreads chunks across a pool
+        self.separation_threads_per_worker = 4  # Torch intra-op threads in each separation worker process
+        self.separation_mask = False  # Only separate around subtitle cues; elsewhere the original audio is the background
+        self.separation_mask_padding = 0.5  # Seconds of audio separated before and after every cue
+        self.separation_mask_crossfade = 0.1  # Seconds blended between separated and passed-through audio
 
         # Language mapping for TTS systems
         self.language_tts_map = {
@@ -16,6 +33,22 @@ class Config:
             # Add more languages here
         }
         
+        # Language names used in translation prompts
+        self.language_names = {
+            "tt": "Tatar",
+            "es": "Spanish",
+            "en": "English",
+            "ru": "Russian",
+        }
+        
+        # ISO 639-2 codes used to tag audio streams in the output video
+        self.language_iso639_2 = {
+            "tt": "tat",
+            "es": "spa",
+            "en": "eng",
+            "ru": "rus",
+        }
+        
         # Speaker mapping for TTS systems
         self.speaker_map = {
             "tt": "dilyara",
@@ -26,20 +59,73 @@ class Config:
         # TTS system options
         self.tts_systems = ["silero"]  # Add more TTS systems as they become available
         self.default_tts = "silero"
+        self.tts_inference_workers = 1  # Threads synthesizing cues at once with one shared model; 1 goes cue by cue
+        self.tts_num_threads = None  # Torch intra-op threads; None keeps the torch default
+        self.tts_workers = 1  # TTS worker processes; more than 1 enables the process pool
+        self.tts_threads_per_worker = 4  # Torch intra-op threads in each TTS worker process
+        self.silero_model_version = "v3"  # Silero speaker package prefix, e.g. v3_tt
+
+        # Pinned Silero and Demucs weights, filled by 'python -m utils.models fetch silero/v3_tt demucs/htdemucs'
+        self.models_dir = os.path.join(self.work_dir, "cache", "models")
+        self.offline_models = False  # Fail instead of falling back to torch.hub/Demucs downloads for uncached models
+
+        # TTS clip cache, shared by every video under the work directory
+        self.tts_cache_enabled = True
+        self.tts_cache_dir = os.path.join(self.work_dir, "cache", "tts")
+        self.tts_cache_max_bytes = 2 * 1024 ** 3  # Least recently used clips are evicted above this size
         
         # Translation service options
         self.translation_services = ["google", "google_gemini"]  # Add more services as they're implemented
         self.default_translation = "google_gemini"
         self.google_model_name = "gemini-2.0-flash"  # Default model for Google Gemini
+        self.gemini_window_size = 0  # Cues per Gemini request; 0 sends the whole video in one prompt
+        self.gemini_window_overlap = 3  # Context cues shared with each neighbouring window
+        self.gemini_max_concurrency = 4  # Windows translated at the same time
+        self.gemini_retries = 2
         self.google_api_key = os.getenv("GOOGLE_GENAI_API_KEY", None)  # Ensure this is set in your environment
+        self.google_translate_batch_chars = 4000  # Max characters packed into one Google Translate request
+        self.google_translate_workers = 4  # Concurrent Google Translate requests
+        self.google_translate_retries = 3
+        self.google_translate_backoff = 1.0  # Seconds before the first retry, doubled on each attempt
+        self.google_translate_service_urls = None  # e.g. ["localhost:8443"] to benchmark against a stub server
+
+        # Translation cache, shared by every video under the work directory
+        self.translation_cache_enabled = True
+        self.translation_cache_file = os.path.join(self.work_dir, "cache", "translations.sqlite")
 
         # Audio processing options
         self.sample_rate = 48000
         self.audio_format = "wav"
+        self.timeline_assembler = "numpy"  # Options: "numpy" (in-process) or "ffmpeg" (per-clip subprocesses)
+        self.time_stretch_workers = 4  # Threads stretching batches of clips in the numpy assembler
+        self.timeline_memmap_seconds = 1800  # Speech timelines longer than this live in a file-backed map, not RAM
+        self.background_mixer = "numpy"  # Options: "numpy" (streaming, ducked, loudness-normalized) or "ffmpeg" (amix)
+        self.duck_db = -12.0  # Background gain in dB under speech
+        self.duck_attack = 0.15  # Seconds the background takes to duck before speech starts
+        self.duck_release = 0.4  # Seconds the background takes to recover after speech ends
+        self.loudness_target = -16.0  # Integrated loudness of the mix in LUFS; None keeps the levels
+        self.mix_block_seconds = 10.0  # Audio mixed per block, which bounds the mixer's memory
         
         # Subtitle processing options
+        self.normalize_auto_captions = True  # Collapse YouTube's rolling auto-caption cues and strip word timings
         self.max_segment_merge_duration = 10  # Max seconds for merging segments
         self.segment_merge_threshold = 0.3   # Max gap between segments to consider merging
+
+        # Speech rate model, calibrated from the TTS clips of every run under the work directory
+        self.speech_rate_file = os.path.join(self.work_dir, "cache", "speech_rate.json")
+        self.speech_rate_planning = False  # Plan cue merges and TTS prosody from predicted speaking time
+        self.speech_rate_max_speedup = 1.1  # Predicted compression above which a cue merges with the next to borrow its pause
+        self.speech_rate_max_prosody = "x-fast"  # Options: "medium", "fast" or "x-fast"
+        self.speech_gap_margin = 0.1  # Seconds kept free before the next cue when a cue is extended
+        
+        # Pipeline execution options
+        self.pipeline_mode = "sequential"  # Options: "sequential", "parallel" or "streaming"
+        self.stream_queue_size = 32  # Items buffered between two streaming stages
+        self.stream_chunk_size = 20  # Cues handed to a translator or TTS worker at a time when streaming
+        self.incremental = True  # Skip stages whose inputs, config and code are unchanged since the last run
+        self.trace_file = None  # Chrome trace-event file written at the end of a run; None disables tracing
+        self.subprocess_workers = None  # Concurrent ffmpeg jobs in the per-clip assembler; None uses one per CPU
+        self.subprocess_timeout = 3600  # Seconds before an ffmpeg, Demucs or Spleeter command is killed; None waits
         
         # Set up paths
         self._setup_paths()
@@ -71,4 +157,18 @@ class Config:
         self.original_audio_file = os.path.join(self.audio_path, "original_audio.wav")
         self.voice_file = os.path.join(self.audio_path, "voice.wav")
         self.bg_file = os.path.join(self.audio_path, "background.wav")
-        self.final_output = os.path.join(self.output_path, f"translated_video_{self.target_language}.mp4")
+        self.final_output = os.path.join(self.output_path, f"translated_video_{'_'.join(self.target_languages)}.mp4")
+
+    def for_language(self, language):
+        """Return a copy of this config for one language of a multi-language run"""
+        language_config = copy.copy(self)
+        language_config.target_language = language
+        language_config.target_languages = [language]
+        language_config.mux_video = False
+        # Per-language artifacts get their own directories so languages never overwrite each other
+        language_config.audio_path = os.path.join(self.audio_path, language)
+        language_config.tts_path = os.path.join(self.tts_path, language)
+        language_config.output_path = os.path.join(self.output_path, language)
+        for path in [language_config.audio_path, language_config.tts_path, language_config.output_path]:
+            os.makedirs(path, exist_ok=True)
+        return language_config
@@ -1,38 +1,70 @@
 #!/usr/bin/env python3
 import argparse
+import os
+import sys
 from config import Config
-from pipeline import Pipeline
+
+def build_config(youtube_url, languages, work_dir="downloads", merge_segments=False, add_silence=False,
+                 youtube_cookies_path=None, pipeline_mode="sequential", force=False, trace_file=None):
+    """Create the configuration of one dubbing job from command line style options"""
+    config = Config(
+        youtube_url=youtube_url,
+        target_language=languages[0],
+        work_dir=work_dir,
+        target_languages=languages
+    )
+    
+    # Configure optional features
+    config.enable_segment_merging = merge_segments
+    config.add_silence_buffers = add_silence
+    config.youtube_cookies_path = youtube_cookies_path
+    config.pipeline_mode = pipeline_mode
+    config.incremental = not force
+    if trace_file is not None:
+        config.trace_file = trace_file or os.path.join(config.project_dir, "trace.json")
+    return config
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        # Long-running mode: models stay loaded and jobs arrive over a local HTTP API
+        from server import main as serve
+        return serve(sys.argv[2:])
+
     # Parse command line arguments
-    parser = argparse.ArgumentParser(description="YouTube Video Auto-Dubber")
+    parser = argparse.ArgumentParser(description="YouTube Video Auto-Dubber (run 'dubber.py serve --help' for the job server)")
     parser.add_argument("youtube_url", help="YouTube video URL to process")
-    parser.add_argument("--language", "-l", default="tt", help="Target language code (default: tt for Tatar)")
+    parser.add_argument("--language", "-l", action="append", default=None, help="Target language code(s), comma separated or given as repeated -l options; several languages produce one video with a dubbed track per language (default: tt for Tatar)")
     parser.add_argument("--work-dir", "-w", default="downloads", help="Working directory (default: downloads)")
     parser.add_argument("--merge-segments", "-m", action="store_true", help="Merge subtitle segments")
     parser.add_argument("--add-silence", "-s", action="store_true", help="Add silence buffers instead of speeding up")
     parser.add_argument("--youtube-cookies-path", "-c", type=str, default=None, help="Use YouTube cookies to download videos")
     parser.add_argument("--start-step", type=str, default=None, help="Processor class name to start the pipeline from.")
+    parser.add_argument("--force", "-f", action="store_true", help="Rerun every stage even if its inputs are unchanged")
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="PATH", help="Record per-stage, subprocess, TTS and translation spans into a Chrome trace file (default: <project dir>/trace.json) and print a summary table")
+    parser.add_argument("--pipeline-mode", choices=["sequential", "parallel", "streaming"], default="sequential", help="Run stages one after another, run independent stages concurrently, or stream cues between translation, TTS and assembly")
 
     args = parser.parse_args()
+    languages = [code.strip() for value in args.language or ["tt"] for code in value.split(",") if code.strip()]
     
     # Create configuration
-    config = Config(
-        youtube_url=args.youtube_url,
-        target_language=args.language,
-        work_dir=args.work_dir
+    config = build_config(
+        args.youtube_url, languages, args.work_dir,
+        merge_segments=args.merge_segments,
+        add_silence=args.add_silence,
+        youtube_cookies_path=args.youtube_cookies_path,
+        pipeline_mode=args.pipeline_mode,
+        force=args.force,
+        trace_file=args.trace
     )
     
-    # Configure optional features
-    config.enable_segment_merging = args.merge_segments
-    config.add_silence_buffers = args.add_silence
-    config.youtube_cookies_path = args.youtube_cookies_path
-    
+    # Processors are imported after argument parsing, so --help stays fast
+    from pipeline import Pipeline
+
     # Create and run pipeline
     pipeline = Pipeline(config)
     
     print(f"Processing YouTube video: {args.youtube_url}")
-    print(f"Target language: {args.language}")
+    print(f"Target language: {', '.join(languages)}")
     print(f"Work directory: {args.work_dir}")
 
     try:
@@ -1,4 +1,9 @@
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from config import Config
+from utils.tracing import span, tracing
 
 # Import processors
 from processors.video_downloader import VideoDownloader
@@ -6,43 +11,280 @@ from processors.audio_extractor import AudioExtractor
 from processors.subtitle_processor import SubtitleProcessor
 from processors.translator import TranslationProcessor
 from processors.tts import TTSProcessor
-from processors.audio_video_generator import AudioVideoGenerator
+from processors.audio_video_generator import AudioVideoGenerator, MultiTrackMuxer
+
+_END_OF_STREAM = object()
+
+class StreamStage:
+    """Runs a streaming processor on its own thread, feeding its outputs into a bounded queue"""
+    def __init__(self, processor, source, data, queue_size):
+        self.processor = processor
+        self.source = source
+        self.data = data
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.outputs = []
+        self.error = None
+        self.exhausted = False
+        self.thread = threading.Thread(target=self._run, name=f"stream-{processor.name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with span(self.processor.name, "stage", streaming=True) as span_args:
+                for item in self.processor.process_stream(self.source, self.data):
+                    self.outputs.append(item)
+                    self.queue.put(item)
+                span_args["items"] = len(self.outputs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            # Drain whatever is left upstream so that a stopped stage never blocks its producer
+            for _ in self.source:
+                pass
+            self.queue.put(_END_OF_STREAM)
+
+    def __iter__(self):
+        """Consume the items produced by this stage"""
+        while not self.exhausted:
+            item = self.queue.get()
+            if item is _END_OF_STREAM:
+                self.exhausted = True
+                return
+            yield item
+
+    def finish(self):
+        """Wait for the stage and return its result dict"""
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.processor.finish_stream(self.outputs, self.data)
 
 class Pipeline:
     """Pipeline orchestration class"""
-    def __init__(self, config):
+    def __init__(self, config, processors=None):
         self.config = config
         self.processors = []
-        self._setup_default_processors()
+        if processors is None:
+            self._setup_default_processors()
+        else:
+            self.processors = list(processors)
         
     def _setup_default_processors(self):
         """Setup default processing pipeline"""
+        # AudioExtractor only needs the video, so it runs ahead of the subtitle
+        # stages and leaves translation, TTS and assembly adjacent for streaming
         self.processors = [
             VideoDownloader(self.config),
+            AudioExtractor(self.config),
             SubtitleProcessor(self.config),
             TranslationProcessor(self.config),
-            AudioExtractor(self.config),
             TTSProcessor(self.config),
             AudioVideoGenerator(self.config)
         ]
     
-    def run(self):
-        """Run the entire pipeline"""
-        data = {}
-        for processor in self.processors:
+    def run(self, data=None):
+        """Run the entire pipeline, optionally starting from data that earlier stages would produce"""
+        data = {} if data is None else dict(data)
+        with tracing(self.config), span("Pipeline.run", "pipeline"):
+            if len(getattr(self.config, "target_languages", [])) > 1:
+                return self.run_multilingual(data)
+            return self._run_processors(self.processors, data)
+
+    def _run_processors(self, processors, data):
+        """Run processors with the configured execution mode"""
+        mode = getattr(self.config, "pipeline_mode", "sequential")
+        if mode == "streaming":
+            return self.run_streaming(processors, data)
+        if mode == "parallel":
+            return self.run_parallel(processors, data)
+
+        for processor in processors:
+            result = self._run_stage(processor, data)
+            # Update data with result for next processor
+            if result:
+                data.update(result)
+        return data
+
+    def run_multilingual(self, data=None):
+        """Run shared stages once, dub every language concurrently and mux all tracks into one video"""
+        shared = [p for p in self.processors if not p.per_language]
+        data = self._run_processors(shared, {} if data is None else data)
+        return self._dub_languages(data)
+
+    def _dub_languages(self, data, resume=False, start_processor_name=None):
+        """Run the per-language stages of every language concurrently, then mux all tracks into one video.
+
+        When resuming, each language starts at start_processor_name and the muxer always runs.
+        """
+        per_language = [p.__class__ for p in self.processors if p.per_language]
+
+        def run_language(language):
+            language_config = self.config.for_language(language)
+            pipeline = Pipeline(language_config, [cls(language_config) for cls in per_language])
+            print(f"Dubbing into {language}...")
+            with span(language, "language"):
+                if resume:
+                    return pipeline._resume_processors(pipeline.processors, start_processor_name, dict(data))
+                return pipeline._run_processors(pipeline.processors, dict(data))
+
+        languages = self.config.target_languages
+        with ThreadPoolExecutor(max_workers=len(languages)) as pool:
+            language_results = dict(zip(languages, pool.map(run_language, languages)))
+
+        data["dubbed_audio_tracks"] = [
+            [language, language_results[language].get("dubbed_audio")] for language in languages
+        ]
+        muxer = MultiTrackMuxer(self.config)
+        if resume:
+            return self._resume_processors([muxer], None, data)
+        result = self._run_stage(muxer, data)
+        if result:
+            data.update(result)
+        return data
+
+    def _run_stage(self, processor, data):
+        """Run a processor, or reuse its recorded outputs when its fingerprint is unchanged"""
+        if not getattr(self.config, "incremental", False):
             print(f"Running {processor.name}...")
+            with span(processor.name, "stage"):
+                return processor.process(data)
+
+        fingerprint = processor.fingerprint(data)
+        cached = processor.load_cached_outputs(fingerprint)
+        if cached is not None:
+            print(f"Skipping {processor.name}: inputs unchanged, reusing recorded outputs")
+            return cached
+
+        print(f"Running {processor.name}...")
+        with span(processor.name, "stage"):
             result = processor.process(data)
-            # Update data with result for next processor
+        self._record_stage(processor, fingerprint, result)
+        return result
+
+    def _record_stage(self, processor, fingerprint, result):
+        """Save a stage manifest unless the stage reported a missing output"""
+        if getattr(self.config, "incremental", False) and result and None not in result.values():
+            processor.save_manifest(fingerprint, result)
+
+    def run_parallel(self, processors=None, data=None):
+        """Run every stage as soon as the stages producing its inputs have finished"""
+        processors = self.processors if processors is None else processors
+        producers = {}
+        for processor in processors:
+            for key in processor.outputs:
+                producers.setdefault(key, []).append(processor)
+
+        data = {} if data is None else data
+        pending = list(processors)
+        finished = set()
+        running = {}
+
+        def is_ready(processor):
+            return all(
+                producer in finished
+                for key in processor.inputs
+                for producer in producers.get(key, [])
+                if producer is not processor
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, len(processors))) as pool:
+            while pending or running:
+                for processor in [p for p in pending if is_ready(p)]:
+                    pending.remove(processor)
+                    # Each stage gets its own snapshot so concurrent stages never share a dict
+                    running[pool.submit(self._run_stage, processor, dict(data))] = processor
+
+                if not running:
+                    names = ", ".join(p.name for p in pending)
+                    raise ValueError(f"Pipeline stages have unsatisfiable inputs: {names}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    processor = running.pop(future)
+                    result = future.result()
+                    if result:
+                        data.update(result)
+                    finished.add(processor)
+        return data
+
+    def run_streaming(self, processors=None, data=None):
+        """Run the pipeline with streaming-capable processors connected by bounded queues"""
+        processors = self.processors if processors is None else processors
+        queue_size = getattr(self.config, "stream_queue_size", 32)
+        data = {} if data is None else data
+        stages = []
+        open_streams = {}  # stream key -> stage producing it that nobody consumes yet
+
+        for processor in processors:
+            key = processor.stream_input
+            if key is not None and (key in open_streams or data.get(key)):
+                if key not in open_streams and getattr(self.config, "incremental", False):
+                    # The whole input is already known, so the stage may be skipped entirely
+                    cached = processor.load_cached_outputs(processor.fingerprint(data))
+                    if cached is not None:
+                        print(f"Skipping {processor.name}: inputs unchanged, reusing recorded outputs")
+                        data.update(cached)
+                        continue
+                source = open_streams.pop(key) if key in open_streams else iter(data[key])
+                print(f"Streaming {processor.name}...")
+                stage = StreamStage(processor, source, data, queue_size).start()
+                stages.append(stage)
+                if processor.stream_output:
+                    open_streams[processor.stream_output] = stage
+                continue
+
+            # Batch-only processors see complete data, so streams they read from finish first
+            pending_keys = {key for stage in stages for key in stage.processor.outputs}
+            if pending_keys & set(processor.inputs):
+                self._finish_stages(stages, open_streams, data)
+            result = self._run_stage(processor, data)
             if result:
                 data.update(result)
+
+        self._finish_stages(stages, open_streams, data)
         return data
 
+    def _finish_stages(self, stages, open_streams, data):
+        """Drain unconsumed streams, wait for every stage and merge the results into data"""
+        for stage in open_streams.values():
+            for _ in stage:
+                pass
+        open_streams.clear()
+        for stage in stages:
+            result = stage.finish()
+            # Upstream stages finish first, so data now holds this stage's complete inputs
+            self._record_stage(stage.processor, stage.processor.fingerprint(data), result)
+            if result:
+                data.update(result)
+        stages.clear()
+
     def run_from_step(self, start_processor_name=None):
         """Run the pipeline starting from a specific step"""
+        with tracing(self.config), span("Pipeline.run_from_step", "pipeline"):
+            return self._run_from_step(start_processor_name)
+
+    def _run_from_step(self, start_processor_name):
+        if len(getattr(self.config, "target_languages", [])) > 1:
+            return self._run_multilingual_from_step(start_processor_name)
+        return self._resume_processors(self.processors, start_processor_name, {})
+
+    def _run_multilingual_from_step(self, start_processor_name):
+        """Resume a multi-language run: shared stages once, every language from the step, then the muxer"""
+        shared = [p for p in self.processors if not p.per_language]
+        data = self._resume_processors(shared, start_processor_name, {})
+        # Starting at a shared stage means every per-language stage has to run again
+        if start_processor_name in [p.name for p in shared]:
+            start_processor_name = None
+        return self._dub_languages(data, resume=True, start_processor_name=start_processor_name)
+
+    def _resume_processors(self, processors, start_processor_name, data):
+        """Load the recorded outputs of processors before the start step and run the rest"""
         start_processing = start_processor_name is None
-        data = {}
 
-        for processor in self.processors:
+        for processor in processors:
             processor_name = processor.__class__.__name__
 
             if not start_processing:
@@ -51,10 +293,16 @@ class Pipeline:
                 else:
                     # Load intermediate results for skipped steps
                     print(f"Loading results for skipped processor: {processor_name}")
-                    saved_data = processor.load_output(f"{processor_name}_output.json")
-                    if saved_data is not None:
-                        data.update(saved_data)
+                    manifest = processor.load_manifest()
+                    if manifest is not None:
+                        data.update(manifest["outputs"])
                     continue
 
             print(f"Running processor: {processor_name}")
-            data = processor.process(data)  # Pass data to the processor and update it
\ No newline at end of file
+            fingerprint = processor.fingerprint(data)
+            with span(processor_name, "stage"):
+                result = processor.process(data)  # Pass data to the processor and update it
+            self._record_stage(processor, fingerprint, result)
+            if result:
+                data.update(result)
+        return data
@@ -4,4 +4,4 @@ from processors.audio_extractor import AudioExtractor
 from processors.subtitle_processor import SubtitleProcessor
 from processors.translator import TranslationProcessor
 from processors.tts import TTSProcessor
-from processors.audio_video_generator import AudioVideoGenerator
\ No newline at end of file
+from processors.audio_video_generator import AudioVideoGenerator, MultiTrackMuxer
\ No newline at end of file
@@ -1,14 +1,30 @@
 from utils.video import extract_audio, separate_audio
+from utils.wav import wav_metadata
 from processors.base import Processor
 
 class AudioExtractor(Processor):
+    inputs = ("audio_source", "subtitle_file")
+    outputs = ("original_audio", "voice_file", "bg_file", "audio_info")
+    config_fields = ("audio_separator", "demucs_backend", "demucs_model",
+                     "separation_chunk_seconds", "separation_overlap_seconds",
+                     "separation_mask", "separation_mask_padding", "separation_mask_crossfade")
+    code_modules = ("utils.video", "utils.helpers", "utils.separation", "utils.wav", "utils.cues")
+
     def process(self, data=None):
         """Extract and separate audio from video"""
-        original_audio = extract_audio(self.config)
-        voice_file, bg_file = separate_audio(self.config)
+        original_audio = extract_audio(self.config, data.get("audio_source") if data else None)
+        # Subtitle timings let the separator skip stretches without speech
+        subtitle_file = data.get("subtitle_file") if data else None
+        voice_file, bg_file = separate_audio(self.config, subtitle_file)
         
         return {
             "original_audio": original_audio,
             "voice_file": voice_file,
-            "bg_file": bg_file
+            "bg_file": bg_file,
+            # Exact lengths and rates so later stages need not probe the stems again
+            "audio_info": {
+                "original_audio": wav_metadata(original_audio),
+                "voice_file": wav_metadata(voice_file),
+                "bg_file": wav_metadata(bg_file),
+            },
         }
\ No newline at end of file
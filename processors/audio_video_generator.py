@@ -1,15 +1,105 @@
-from utils.audio import create_adjusted_audio_video
+import os
+
+from utils.audio import (TimelineAssembler, build_speech_timeline, concat_speech_clips, cue_intervals, mix_and_mux,
+                         new_speech_timeline)
+from utils.subtitles import time_to_seconds
+from utils.video import wait_for_video
+from utils.wav import wav_metadata
 from processors.base import Processor
 
 class AudioVideoGenerator(Processor):
+    inputs = ("speech_files", "bg_file", "subtitles")
+    outputs = ("output_video", "dubbed_audio")
+    config_fields = ("sample_rate", "timeline_assembler", "final_output", "mux_video", "background_mixer",
+                     "duck_db", "duck_attack", "duck_release", "loudness_target")
+    code_modules = ("utils.audio", "utils.wav", "utils.timestretch", "utils.mixer")
+    per_language = True
+    stream_input = "speech_files"
+
     def process(self, data=None):
         """Generate final video with translated audio"""
         speech_files = data.get("speech_files", [])
         if not speech_files:
             print("No speech files provided for video generation")
+            return self._result(None)
+
+        if getattr(self.config, "timeline_assembler", "numpy") == "ffmpeg":
+            return self._result(concat_speech_clips(self.config, speech_files), cue_intervals(speech_files))
+        return self._result(build_speech_timeline(self.config, speech_files))
+
+    def _result(self, speech_track, intervals=None):
+        """Mix and mux the speech track, or hand it back when another stage muxes all languages"""
+        if not getattr(self.config, "mux_video", True):
+            return {"dubbed_audio": self._dubbed_audio(speech_track, intervals)}
+        if speech_track is None:
             return {"output_video": None}
-        
-        # Create adjusted audio video
-        output_video = create_adjusted_audio_video(self.config, speech_files)
-        
-        return {"output_video": output_video}
\ No newline at end of file
+        wait_for_video(self.config)
+        try:
+            output_video = mix_and_mux(
+                self.config, [(speech_track, self.config.target_language, intervals)], self.config.final_output
+            )
+        finally:
+            if isinstance(speech_track, TimelineAssembler):
+                speech_track.release()
+        return {"output_video": output_video}
+
+    def _dubbed_audio(self, speech_track, intervals=None):
+        """Write the speech track to disk and describe it like a speech entry, with its length and speech intervals"""
+        if speech_track is None:
+            return None
+        if isinstance(speech_track, TimelineAssembler):
+            final_wav_file = os.path.join(self.config.audio_path, "final_uncompressed.wav")
+            dubbed_audio = {"file": speech_track.write(final_wav_file),
+                            "num_samples": speech_track.length, "sample_rate": speech_track.sample_rate,
+                            "intervals": speech_track.intervals}
+            speech_track.release()
+            return dubbed_audio
+        return dict(file=speech_track, intervals=intervals, **wav_metadata(speech_track))
+
+    def process_stream(self, speech_files, data):
+        """Place clips on the timeline as they arrive; nothing is emitted downstream"""
+        self._assembler = None
+        if getattr(self.config, "timeline_assembler", "numpy") == "ffmpeg":
+            # The ffmpeg path needs the complete list, so just collect it
+            self._speech_files = list(speech_files)
+            return []
+
+        # Size the timeline from the source cues; it grows if translation moved the end
+        subtitles = data.get("subtitles") or []
+        duration = max((time_to_seconds(s['end']) for s in subtitles), default=0.0)
+        self._assembler = new_speech_timeline(self.config, duration)
+        self._speech_files = self._assembler.add_speech_clips(speech_files)
+        return []
+
+    def finish_stream(self, outputs, data):
+        """Mix and mux the assembled timeline"""
+        if not self._speech_files:
+            print("No speech files provided for video generation")
+            return self._result(None)
+
+        if self._assembler is None:
+            return self._result(concat_speech_clips(self.config, self._speech_files), cue_intervals(self._speech_files))
+        return self._result(self._assembler)
+
+class MultiTrackMuxer(Processor):
+    # The video may still be downloading when this stage is fingerprinted, so it is awaited rather than an input
+    inputs = ("dubbed_audio_tracks", "bg_file")
+    outputs = ("output_video",)
+    config_fields = ("final_output", "language_iso639_2", "sample_rate", "background_mixer",
+                     "duck_db", "duck_attack", "duck_release", "loudness_target")
+    code_modules = ("utils.audio", "utils.mixer", "utils.wav")
+
+    def process(self, data=None):
+        """Mix every language's speech track with the background and mux them into one video"""
+        tracks = [
+            # Tracks recorded without intervals fall back to level detection in the mixer
+            (dubbed_audio["file"], language, dubbed_audio.get("intervals"))
+            for language, dubbed_audio in data.get("dubbed_audio_tracks", [])
+            if dubbed_audio
+        ]
+        if not tracks:
+            print("No dubbed audio tracks provided for muxing")
+            return {"output_video": None}
+
+        wait_for_video(self.config)
+        return {"output_video": mix_and_mux(self.config, tracks, self.config.final_output)}
@@ -1,8 +1,27 @@
+import importlib.util
+import inspect
 import json
 import os
 
+from utils.helpers import collect_file_paths, fingerprint, hash_file
+
 class Processor:
     """Base class for all processors in the pipeline"""
+    # Data keys read from and written to the pipeline data; the parallel
+    # scheduler uses them to decide which stages can run at the same time
+    inputs = ()
+    outputs = ()
+    # Config attributes and helper modules whose changes invalidate a stage's outputs
+    config_fields = ()
+    code_modules = ()
+    # Stages that run once per target language in a multi-language run
+    per_language = False
+
+    # Data keys consumed and produced item by item in streaming mode.
+    # Processors that leave stream_input unset only ever run in batch.
+    stream_input = None
+    stream_output = None
+
     def __init__(self, config):
         self.config = config
         self.name = self.__class__.__name__
@@ -10,6 +29,14 @@ class Processor:
     def process(self, data=None):
         """Process data and return result"""
         raise NotImplementedError("Each processor must implement process()")
+
+    def process_stream(self, items, data):
+        """Consume stream_input items incrementally and return an iterable of stream_output items"""
+        raise NotImplementedError(f"{self.name} does not support streaming")
+
+    def finish_stream(self, outputs, data):
+        """Return the result dict once the stream has been fully consumed"""
+        return {self.stream_output: outputs} if self.stream_output else {}
         
     def save_output(self, data, filename):
         """Save processor output to file"""
@@ -23,4 +50,53 @@ class Processor:
         if os.path.exists(file_path):
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
-        return None
\ No newline at end of file
+        return None
+
+    def _manifest_path(self):
+        return os.path.join(self.config.output_path, f"{self.name}_manifest.json")
+
+    def code_version(self):
+        """Hash the source of this processor and the helper modules it relies on"""
+        sources = [inspect.getsourcefile(self.__class__)]
+        for module_name in self.code_modules:
+            spec = importlib.util.find_spec(module_name)
+            if spec is not None and spec.origin:
+                sources.append(spec.origin)
+        return [hash_file(source) for source in sources if source and os.path.isfile(source)]
+
+    def fingerprint(self, data):
+        """Fingerprint everything that determines this stage's outputs"""
+        data = data or {}
+        return fingerprint({
+            "processor": self.name,
+            "code": self.code_version(),
+            "config": {field: getattr(self.config, field, None) for field in self.config_fields},
+            "inputs": {key: data.get(key) for key in self.inputs},
+        })
+
+    def save_manifest(self, fingerprint_hash, result):
+        """Record the fingerprint and outputs of a successful run"""
+        manifest = {
+            "fingerprint": fingerprint_hash,
+            "outputs": result,
+            "artifacts": collect_file_paths(result),
+        }
+        with open(self._manifest_path(), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def load_manifest(self):
+        """Load the manifest of the previous run, if any"""
+        file_path = self._manifest_path()
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def load_cached_outputs(self, fingerprint_hash):
+        """Return the recorded outputs if the fingerprint matches and every artifact still exists"""
+        manifest = self.load_manifest()
+        if not manifest or manifest.get("fingerprint") != fingerprint_hash:
+            return None
+        if not all(os.path.exists(path) for path in manifest.get("artifacts", [])):
+            return None
+        return manifest.get("outputs")
@@ -1,17 +1,35 @@
-from utils.subtitles import parse_vtt, merge_subtitle_segments
+from utils.speech_rate import SpeechRateModel
+from utils.cues import parse_cues
+from utils.subtitles import is_rolling_captions, merge_cue_table, merge_subtitle_segments, normalize_auto_captions
 from processors.base import Processor
 
 class SubtitleProcessor(Processor):
+    inputs = ("subtitle_file",)
+    outputs = ("subtitles", "original_subtitles")
+    config_fields = ("normalize_auto_captions", "enable_segment_merging", "max_segment_merge_duration", "segment_merge_threshold",
+                     "speech_rate_planning", "speech_rate_max_speedup", "speech_gap_margin")
+    code_modules = ("utils.subtitles", "utils.cues", "utils.speech_rate")
+
     def process(self, data=None):
         """Process subtitles - parse and optionally merge segments"""
         subtitle_file = data.get("subtitle_file") if data else self.config.subtitle_file
         
         # Parse VTT file
-        subtitles = parse_vtt(subtitle_file)
+        cues = parse_cues(subtitle_file)
+        if getattr(self.config, "normalize_auto_captions", True) and is_rolling_captions(cues):
+            rolling_count = len(cues)
+            cues = normalize_auto_captions(cues)
+            print(f"Collapsed {rolling_count} rolling auto-caption cues into {len(cues)}")
+        subtitles = cues.to_dicts()
         
         # Merge subtitle segments if enabled
         if getattr(self.config, "enable_segment_merging", True):
-            merged_subtitles = merge_subtitle_segments(subtitles, self.config)
+            if getattr(self.config, "speech_rate_planning", False):
+                # Cues are planned for the first target language's speaker
+                rate_model = SpeechRateModel.from_config(self.config)
+                merged_subtitles = merge_subtitle_segments(subtitles, self.config, rate_model)
+            else:
+                merged_subtitles = merge_cue_table(cues, self.config).to_dicts()
             
             # Save both original and merged subtitles
             self.save_output(subtitles, "original_subtitles.json")
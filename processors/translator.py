@@ -2,6 +2,15 @@ from utils.translation import get_translator
 from processors.base import Processor
 
 class TranslationProcessor(Processor):
+    inputs = ("subtitles",)
+    outputs = ("translated_subtitles",)
+    config_fields = ("target_language", "language_names", "default_translation", "google_model_name",
+                     "gemini_window_size", "gemini_window_overlap")
+    code_modules = ("utils.translation", "utils.subtitles")
+    per_language = True
+    stream_input = "subtitles"
+    stream_output = "translated_subtitles"
+
     def process(self, data=None):
         """Translate subtitles"""
         subtitles = data.get("subtitles", [])
@@ -20,4 +29,18 @@ class TranslationProcessor(Processor):
         self.save_output(translated_subtitles, f"{translation_service}_translated.json")
         self.save_output(translated_subtitles, f"output.json")
         
-        return {"translated_subtitles": translated_subtitles}
\ No newline at end of file
+        return {"translated_subtitles": translated_subtitles}
+
+    def process_stream(self, subtitles, data):
+        """Yield translated subtitles as the translator produces them"""
+        translator = get_translator(self.config.default_translation, self.config)
+        if hasattr(translator, "translate_stream"):
+            return translator.translate_stream(subtitles)
+        return translator.translate(list(subtitles))
+
+    def finish_stream(self, outputs, data):
+        """Save the streamed translations"""
+        translation_service = self.config.default_translation
+        self.save_output(outputs, f"{translation_service}_translated.json")
+        self.save_output(outputs, f"output.json")
+        return {"translated_subtitles": outputs}
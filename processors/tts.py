@@ -1,7 +1,16 @@
-from utils.tts import get_tts_system
+from utils.tts import generate_in_process_pool, generate_stream_in_process_pool, get_tts_system
 from processors.base import Processor
 
 class TTSProcessor(Processor):
+    inputs = ("translated_subtitles",)
+    outputs = ("speech_files",)
+    config_fields = ("target_language", "default_tts", "language_tts_map", "speaker_map",
+                     "sample_rate", "silero_model_version", "speech_rate_planning", "speech_rate_max_prosody")
+    code_modules = ("utils.tts", "utils.speech_rate")
+    per_language = True
+    stream_input = "translated_subtitles"
+    stream_output = "speech_files"
+
     def process(self, data=None):
         """Generate speech from translated subtitles"""
         translated_subtitles = data.get("translated_subtitles", [])
@@ -11,13 +20,36 @@ class TTSProcessor(Processor):
         
         # Get TTS system based on config
         tts_system_name = self.config.default_tts
-        tts_system = get_tts_system(tts_system_name, self.config)
         
         # Generate speech
-        speech_files = tts_system.generate(translated_subtitles)
+        if getattr(self.config, "tts_workers", 1) > 1:
+            speech_files = generate_in_process_pool(tts_system_name, self.config, translated_subtitles)
+        else:
+            tts_system = get_tts_system(tts_system_name, self.config)
+            speech_files = tts_system.generate(translated_subtitles)
+            if getattr(tts_system, "cache", None) is not None:
+                tts_system.cache.report()
         
         # Save output
         self.save_output(speech_files, f"{tts_system_name}_speech_files.json")
         self.save_output(speech_files, f"output.json")
         
-        return {"speech_files": speech_files}
\ No newline at end of file
+        return {"speech_files": speech_files}
+
+    def process_stream(self, translated_subtitles, data):
+        """Yield speech file entries as each incoming subtitle is synthesized"""
+        tts_system_name = self.config.default_tts
+        self._tts_system = None
+        if getattr(self.config, "tts_workers", 1) > 1:
+            return generate_stream_in_process_pool(tts_system_name, self.config, translated_subtitles)
+        self._tts_system = get_tts_system(tts_system_name, self.config)
+        return self._tts_system.generate_stream(translated_subtitles)
+
+    def finish_stream(self, outputs, data):
+        """Save the streamed speech file list"""
+        tts_system_name = self.config.default_tts
+        if getattr(self._tts_system, "cache", None) is not None:
+            self._tts_system.cache.report()
+        self.save_output(outputs, f"{tts_system_name}_speech_files.json")
+        self.save_output(outputs, f"output.json")
+        return {"speech_files": outputs}
@@ -1,8 +1,20 @@
-from utils.video import download_video_and_subtitles
+from utils.video import download_audio_and_subtitles, download_video_and_subtitles, start_video_download
 from processors.base import Processor
 
 class VideoDownloader(Processor):
+    outputs = ("subtitle_file", "video_file", "audio_source")
+    config_fields = ("youtube_url", "audio_first_download")
+    code_modules = ("utils.video",)
+
     def process(self, data=None):
         """Download video and subtitles"""
-        subtitle_file = download_video_and_subtitles(self.config)
-        return {"subtitle_file": subtitle_file}
\ No newline at end of file
+        if not getattr(self.config, "audio_first_download", False):
+            subtitle_file = download_video_and_subtitles(self.config)
+            return {"subtitle_file": subtitle_file, "video_file": self.config.video_file,
+                    "audio_source": self.config.video_file}
+
+        # Later stages only need the audio; the video keeps downloading until the final mux
+        subtitle_file, audio_source = download_audio_and_subtitles(self.config)
+        start_video_download(self.config)
+        return {"subtitle_file": subtitle_file, "video_file": self.config.video_file,
+                "audio_source": audio_source}
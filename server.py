@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Long-running dubbing server: models stay loaded and jobs arrive over a local HTTP API"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from dubber import build_config
+from pipeline import Pipeline
+from utils.tracing import add_span_listener
+from utils.video import get_video_id
+
+# Job options a client may set and their types; everything else comes from the server's own configuration
+JOB_OPTIONS = {"merge_segments": bool, "add_silence": bool, "pipeline_mode": str, "force": bool}
+PIPELINE_MODES = ("sequential", "parallel", "streaming")
+# Latencies kept per span name for the percentiles in /metrics
+_LATENCY_WINDOW = 1000
+
+class QueueFull(Exception):
+    pass
+
+def parse_job_request(request):
+    """Validate a job request body and return (youtube_url, languages, options); raises ValueError"""
+    if not isinstance(request, dict):
+        raise ValueError("the body must be a JSON object")
+    youtube_url = request.get("url")
+    if not isinstance(youtube_url, str):
+        raise ValueError("'url' must be a string")
+    get_video_id(youtube_url)
+
+    languages = request.get("languages")
+    if isinstance(languages, str):
+        languages = languages.split(",")
+    if languages is not None and not (isinstance(languages, list) and all(isinstance(code, str) for code in languages)):
+        raise ValueError("'languages' must be a list of language codes or a comma-separated string")
+    languages = [code.strip() for code in languages or [] if code.strip()]
+
+    options = {}
+    for key, expected in JOB_OPTIONS.items():
+        if key not in request:
+            continue
+        # bool is checked exactly, so "no" or 0 is not silently taken as an answer
+        if type(request[key]) is not expected:
+            raise ValueError(f"'{key}' must be a {'boolean' if expected is bool else 'string'}")
+        options[key] = request[key]
+    if options.get("pipeline_mode", "sequential") not in PIPELINE_MODES:
+        raise ValueError(f"'pipeline_mode' must be one of {', '.join(PIPELINE_MODES)}")
+    return youtube_url, languages, options
+
+class Job:
+    """One dubbing request and its progress"""
+    def __init__(self, youtube_url, languages, options):
+        self.id = uuid.uuid4().hex[:12]
+        self.youtube_url = youtube_url
+        self.languages = languages
+        self.options = options
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.output_video = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "url": self.youtube_url,
+            "languages": self.languages,
+            "options": self.options,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "output_video": self.output_video,
+            "error": self.error,
+        }
+
+class SpanMetrics:
+    """Latency statistics of every finished span, fed by the tracing layer"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counts = {}
+
+    def __call__(self, name, category, seconds, args):
+        key = f"{category}:{name}"
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=_LATENCY_WINDOW)).append(seconds)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = {key: sorted(values) for key, values in self._latencies.items()}
+            counts = dict(self._counts)
+        return {
+            key: {
+                "count": counts[key],
+                "mean_s": sum(values) / len(values),
+                "p50_s": values[len(values) // 2],
+                "p95_s": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max_s": values[-1],
+            }
+            for key, values in latencies.items()
+        }
+
+class JobQueue:
+    """Runs jobs on a bounded pool of worker threads that share the process's warm models"""
+    def __init__(self, work_dir, workers=1, max_queued=100, max_history=1000):
+        self.work_dir = work_dir
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_history = max_history
+        self.started = time.time()
+        self.jobs = {}
+        self._lock = threading.Lock()
+        # Jobs for the same video share a project directory, so they run one at a time
+        self._project_locks = {}
+        # Finish times of successful and of failed jobs, kept apart so failures do not count as throughput
+        self._done_times = deque(maxlen=10000)
+        self._failed_times = deque(maxlen=10000)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.span_metrics = SpanMetrics()
+        add_span_listener(self.span_metrics)
+
+    def submit(self, youtube_url, languages, options):
+        job = Job(youtube_url, languages, options)
+        with self._lock:
+            if sum(1 for j in self.jobs.values() if j.status == "queued") >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs are already queued")
+            self.jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        for job in sorted(finished, key=lambda job: job.finished)[:max(0, len(finished) - self.max_history)]:
+            del self.jobs[job.id]
+
+    def _run(self, job):
+        try:
+            config = build_config(job.youtube_url, job.languages, self.work_dir, **job.options)
+            with self._lock:
+                project_lock = self._project_locks.setdefault(config.project_dir, threading.Lock())
+            with project_lock:
+                job.status = "running"
+                job.started = time.time()
+                print(f"Job {job.id}: dubbing {job.youtube_url} into {', '.join(job.languages)}")
+                result = Pipeline(config).run()
+            job.output_video = result.get("output_video")
+            job.status = "done" if job.output_video else "failed"
+            if job.output_video is None:
+                job.error = "Pipeline completed but no output video was created"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                (self._done_times if job.status == "done" else self._failed_times).append(job.finished)
+            print(f"Job {job.id}: {job.status}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def metrics(self):
+        now = time.time()
+        with self._lock:
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            done_last_hour = sum(1 for finished in self._done_times if finished > now - 3600)
+            done_total = len(self._done_times)
+            failed_last_hour = sum(1 for finished in self._failed_times if finished > now - 3600)
+        uptime = now - self.started
+        return {
+            "uptime_s": uptime,
+            "workers": self.workers,
+            "queue_depth": statuses.get("queued", 0),
+            "running": statuses.get("running", 0),
+            "jobs": statuses,
+            "throughput": {
+                "jobs_last_hour": done_last_hour,
+                "jobs_per_hour": done_total / uptime * 3600 if uptime > 0 else 0.0,
+                "failed_last_hour": failed_last_hour,
+            },
+            "spans": self.span_metrics.snapshot(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def preload_models(languages, work_dir):
+    """Load the TTS model of every language and the separator once, before the first job arrives"""
+    # Built like a job's config so the preloaded models come from the same pinned models_dir
+    config = build_config(None, languages, work_dir)
+    try:
+        from utils.tts import load_silero_model
+        for language in languages:
+            print(f"Loading Silero TTS model for {language}...")
+            load_silero_model(config.language_tts_map.get(language, language), config.silero_model_version,
+                              config.models_dir, config.offline_models)
+        if config.audio_separator == "demucs" and config.demucs_backend == "inprocess":
+            from utils.separation import get_demucs_model
+            print(f"Loading Demucs model {config.demucs_model}...")
+            get_demucs_model(config.demucs_model, config.models_dir, config.offline_models)
+    except Exception as e:
+        # Jobs load whatever is missing themselves, so the server still starts
+        print(f"Error preloading models: {e}")
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs, GET /jobs/<id>, GET /metrics and GET /health"""
+    def _send(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        queue = self.server.job_queue
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            return self._send(200, {"status": "ok"})
+        if path == "/metrics":
+            return self._send(200, queue.metrics())
+        if path == "/jobs":
+            return self._send(200, {"jobs": queue.list()})
+        if path.startswith("/jobs/"):
+            job = queue.get(path[len("/jobs/"):])
+            if job is None:
+                return self._send(404, {"error": "Unknown job"})
+            return self._send(200, job.to_dict())
+        return self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            return self._send(404, {"error": f"Unknown path {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            youtube_url, languages, options = parse_job_request(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as e:
+            return self._send(400, {"error": f"Invalid job request: {e}"})
+        languages = languages or [self.server.default_language]
+        try:
+            job = self.server.job_queue.submit(youtube_url, languages, options)
+        except QueueFull as e:
+            return self._send(503, {"error": str(e)})
+        return self._send(202, job.to_dict())
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="dubber.py serve", description="Run the dubbing job server")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--work-dir", "-w", default="downloads", help="Working directory (default: downloads)")
+    parser.add_argument("--workers", type=int, default=1, help="Jobs run at the same time (default: 1)")
+    parser.add_argument("--max-queued", type=int, default=100, help="Queued jobs accepted before submissions are refused (default: 100)")
+    parser.add_argument("--preload", nargs="*", default=["tt"], help="Languages whose TTS models are loaded at startup (default: tt)")
+    args = parser.parse_args(argv)
+
+    if args.preload:
+        preload_models(args.preload, args.work_dir)
+
+    if args.socket:
+        server = UnixHTTPServer(args.socket, JobRequestHandler)
+        address = args.socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    server.job_queue = JobQueue(args.work_dir, max(1, args.workers), args.max_queued)
+    server.default_language = args.preload[0] if args.preload else "tt"
+
+    print(f"Dubbing server listening on {address} with {args.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.job_queue.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+
+from utils import cache
+from utils.cache import TTSClipCache
+
+def write_clip(path, size):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return path
+
+def test_overwriting_a_key_counts_only_the_new_clip(tmp_path):
+    clip_cache = TTSClipCache(str(tmp_path / "clips"), max_bytes=10_000)
+    small = write_clip(tmp_path / "small.wav", 1000)
+    large = write_clip(tmp_path / "large.wav", 1500)
+
+    for _ in range(5):
+        clip_cache.put("a" * 64, small)
+    clip_cache.put("a" * 64, large)
+    clip_cache.put("b" * 64, small)
+
+    assert cache._cache_sizes[os.path.abspath(clip_cache.cache_dir)] == 2500
+
+def test_cache_size_is_shared_by_instances_and_measured_on_first_store(tmp_path):
+    cache_dir = str(tmp_path / "clips")
+    clip = write_clip(tmp_path / "clip.wav", 1000)
+    TTSClipCache(cache_dir, max_bytes=10_000).put("a" * 64, clip)
+    cache._cache_sizes.clear()
+
+    first = TTSClipCache(cache_dir, max_bytes=10_000)
+    second = TTSClipCache(cache_dir, max_bytes=10_000)
+    assert os.path.abspath(cache_dir) not in cache._cache_sizes
+
+    first.put("b" * 64, clip)
+    second.put("c" * 64, clip)
+    assert cache._cache_sizes[os.path.abspath(cache_dir)] == 3000
@@ -0,0 +1,15 @@
+from utils.separation import speech_regions
+
+def test_speech_regions_merge_cues_given_out_of_order(tmp_path):
+    subtitle_file = tmp_path / "cues.vtt"
+    subtitle_file.write_text(
+        "WEBVTT\n\n"
+        "00:00:20.000 --> 00:00:22.000\nthird\n\n"
+        "00:00:01.000 --> 00:00:03.000\nfirst\n\n"
+        "00:00:03.500 --> 00:00:05.000\nsecond\n",
+        encoding="utf-8",
+    )
+
+    regions = speech_regions(str(subtitle_file), 100, 3000, padding=0.5, crossfade=0.0)
+
+    assert regions == [(50, 550), (1950, 2250)]
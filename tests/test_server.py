@@ -0,0 +1,22 @@
+import pytest
+
+from server import parse_job_request
+
+URL = "https://www.youtube.com/watch?v=NLtnm_bRzPw"
+
+def test_valid_request():
+    request = {"url": URL, "languages": "tt, ru", "force": True, "pipeline_mode": "streaming"}
+    assert parse_job_request(request) == (URL, ["tt", "ru"], {"force": True, "pipeline_mode": "streaming"})
+
+@pytest.mark.parametrize("request_body", [
+    [URL],
+    {"languages": ["tt"]},
+    {"url": "https://www.youtube.com/"},
+    {"url": URL, "languages": [1]},
+    {"url": URL, "force": "no"},
+    {"url": URL, "merge_segments": 1},
+    {"url": URL, "pipeline_mode": "turbo"},
+])
+def test_invalid_request(request_body):
+    with pytest.raises(ValueError):
+        parse_job_request(request_body)
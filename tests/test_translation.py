@@ -0,0 +1,84 @@
+import asyncio
+import re
+import types
+
+from config import Config
+from utils.subtitles import time_to_seconds
+from utils.translation import GoogleGeminiTranslator
+
+_CUE = re.compile(r"^[ \t]*(\S+) --> (\S+)\n(.*)$", re.MULTILINE)
+
+class FakeModels:
+    """Answers every prompt with its cues translated as 'tt:<text>', recording concurrency"""
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def generate_content(self, model, contents):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        content = contents.split("Translate this content:", 1)[1]
+        cues = "\n\n".join(f"{start} --> {end}\ntt:{text.strip()}" for start, end, text in _CUE.findall(content))
+        return types.SimpleNamespace(text=f"WEBVTT\n\n{cues}\n")
+
+def make_translator(tmp_path, window_size, max_concurrency):
+    config = Config(work_dir=str(tmp_path))
+    config.gemini_window_size = window_size
+    config.gemini_window_overlap = 2
+    config.gemini_max_concurrency = max_concurrency
+    models = FakeModels()
+    client = types.SimpleNamespace(aio=types.SimpleNamespace(models=models))
+    return GoogleGeminiTranslator(config, client=client), models
+
+def make_cues(count):
+    cues = []
+    for i in range(count):
+        start = i * 2.0
+        # Every fifth cue runs into the next one, as overlapping source cues do
+        end = start + (3.0 if i % 5 == 4 else 1.5)
+        cues.append({
+            "index": i + 1,
+            "start": f"00:{int(start // 60):02d}:{start % 60:06.3f}",
+            "end": f"00:{int(end // 60):02d}:{end % 60:06.3f}",
+            "text": f"cue {i}",
+        })
+    return cues
+
+def test_windowed_translation_keeps_every_cue_in_order(tmp_path):
+    cues = make_cues(47)
+    translator, models = make_translator(tmp_path, window_size=10, max_concurrency=2)
+
+    translated = asyncio.run(translator._translate_windowed(cues, 10))
+
+    assert models.calls == 5
+    assert [cue["text"] for cue in translated] == [f"tt:cue {i}" for i in range(47)]
+    assert [cue["start"] for cue in translated] == [cue["start"] for cue in cues]
+    assert [cue["index"] for cue in translated] == list(range(1, 48))
+    starts = [time_to_seconds(cue["start"]) for cue in translated]
+    assert starts == sorted(starts)
+
+def test_windowed_translation_respects_concurrency_cap(tmp_path):
+    translator, models = make_translator(tmp_path, window_size=5, max_concurrency=3)
+
+    asyncio.run(translator._translate_windowed(make_cues(60), 5))
+
+    assert models.calls == 12
+    assert models.max_active == 3
+
+def test_prompt_names_each_language_of_a_multilingual_run(tmp_path):
+    config = Config(work_dir=str(tmp_path), target_languages=["tt", "es"])
+    for language, name, other in [("tt", "Tatar", "Spanish"), ("es", "Spanish", "Tatar")]:
+        language_config = config.for_language(language)
+        translator = GoogleGeminiTranslator(language_config, client=object())
+
+        prompt = translator._build_prompt("00:00:00.000 --> 00:00:01.000\nHello", language_config.target_language)
+
+        assert f"from English to {name}" in prompt
+        assert other not in prompt
@@ -1,6 +1,25 @@
-from utils.audio import *
-from utils.subtitles import *
-from utils.translation import *
-from utils.tts import *
-from utils.video import *
-from utils.helpers import *
\ No newline at end of file
+import importlib
+import importlib.util
+
+# Names from these modules are available as utils.<name>. They are resolved on first
+# access (PEP 562) so that importing any one helper does not import every backend.
+_modules = ("audio", "subtitles", "translation", "tts", "video", "helpers")
+
+def __getattr__(name):
+    if name.startswith("_"):
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    if importlib.util.find_spec(f"utils.{name}") is not None:
+        return importlib.import_module(f"utils.{name}")
+    for module_name in _modules:
+        module = importlib.import_module(f"utils.{module_name}")
+        if hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module 'utils' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(set(globals()) | {
+        name for module_name in _modules
+        for name in dir(importlib.import_module(f"utils.{module_name}")) if not name.startswith("_")
+    })
@@ -1,12 +1,29 @@
 import os
-import subprocess
 import ffmpeg
+import numpy as np
 
-from utils.helpers import run_subprocess_with_logging
+from utils.executor import run_command, run_commands
+from utils.helpers import chunked
+from utils.mixer import mix_track
 from utils.subtitles import time_to_seconds
+from utils.timestretch import time_stretch, time_stretch_batch
+from utils.wav import WavWriter, read_wav, read_wav_info, resample, to_mono
+
+def _wav_info(input_media):
+    """Read (sample_rate, channels, num_frames) from a WAV header, or None for other files"""
+    if not input_media.lower().endswith(".wav"):
+        return None
+    try:
+        return read_wav_info(input_media)
+    except (OSError, ValueError):
+        return None
 
 def get_duration(input_media):
     """Get duration of audio/video file"""
+    # WAV headers give the exact length without spawning ffprobe
+    info = _wav_info(input_media)
+    if info is not None:
+        return info[2] / info[0]
     try:
         probe = ffmpeg.probe(input_media)
         return float(probe["format"]["duration"])
@@ -16,6 +33,9 @@ def get_duration(input_media):
 
 def get_frequency(input_media):
     """Get sample rate of audio file"""
+    info = _wav_info(input_media)
+    if info is not None:
+        return float(info[0])
     try:
         probe = ffmpeg.probe(input_media)
         for stream in probe.get('streams', []):
@@ -26,59 +46,221 @@ def get_frequency(input_media):
         print(f"Error getting frequency for {input_media}: {e.stderr.decode('utf8')}")
         return None
 
-def adjust_audio_timing(audio_file, start_time, end_time, speed_factor=1.0):
-    """Adjusts timing and speed of audio file"""
+def _adjust_audio_command(audio_file, start_time, end_time, speed_factor=1.0):
+    """The ffmpeg arguments that adjust a clip's timing and speed, and the file they write"""
     output_file = audio_file.replace(".wav", "_adjusted.wav")
-    duration = end_time - start_time
-
     if speed_factor != 1.0:
-        command = f"ffmpeg -i {audio_file} -filter:a \"atempo={speed_factor}, asetpts=PTS-STARTPTS\" -c:a pcm_s16le {output_file} -y"
+        command = ["ffmpeg", "-i", audio_file, "-filter:a", f"atempo={speed_factor}, asetpts=PTS-STARTPTS",
+                   "-c:a", "pcm_s16le", output_file, "-y"]
     else:
-        command = f"ffmpeg -i {audio_file} -ss {start_time} -t {duration} -c:a pcm_s16le {output_file} -y"
+        command = ["ffmpeg", "-i", audio_file, "-ss", str(start_time), "-t", str(end_time - start_time),
+                   "-c:a", "pcm_s16le", output_file, "-y"]
+    return command, output_file
 
-    with open("adjust_output.log", "w") as log_file:
-        output = subprocess.run(command, shell=True, stdout=log_file, stderr=log_file)
-        if output.returncode != 0:
-            print(f"Error adjusting audio: {output.stderr.decode() if output.stderr else 'No error'}")
-            return audio_file
+def adjust_audio_timing(audio_file, start_time, end_time, speed_factor=1.0, timeout=None):
+    """Adjusts timing and speed of audio file"""
+    command, output_file = _adjust_audio_command(audio_file, start_time, end_time, speed_factor)
+    # One log per clip, so a failure is not overwritten by the next clip
+    result = run_command(command, timeout, log_path=output_file.replace(".wav", ".log"))
+    if not result.ok:
+        print(f"Error adjusting audio: {result.describe()}")
+        return audio_file
     return output_file
 
-def generate_silence(duration, output_path):
-    """Generate silent audio of specified duration"""
+def _silence_command(duration, output_path):
     output_file = os.path.join(output_path, f"silence_{int(duration * 1000)}.wav")
-    command = f"ffmpeg -f lavfi -i anullsrc=channel_layout=stereo:sample_rate=44100 -t {duration} {output_file} -y"
-    run_subprocess_with_logging(command)
+    command = ["ffmpeg", "-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100",
+               "-t", str(duration), output_file, "-y"]
+    return command, output_file
+
+def generate_silence(duration, output_path, timeout=None):
+    """Generate silent audio of specified duration"""
+    command, output_file = _silence_command(duration, output_path)
+    result = run_command(command, timeout)
+    if not result.ok:
+        print(f"Error generating silence: {result.describe()}")
     return output_file
 
-def create_adjusted_audio_video(config, speech_files):
-    """Create final video with adjusted audio timing"""
-    video_file = config.video_file
-    bg_audio_file = config.bg_file
+def get_clip_duration(speech_data):
+    """Duration of a speech clip from its recorded sample count, reading the WAV header if it has none"""
+    if speech_data.get('num_samples') is not None and speech_data.get('sample_rate'):
+        return speech_data['num_samples'] / speech_data['sample_rate']
+    return get_duration(speech_data['file'])
+
+def plan_speech_timing(file_duration, sub_duration):
+    """Choose the speed factor for a clip and whether it should be padded with silence"""
+    # Instead of slowing down audio too much, add silence if needed
+    use_silence = False
+    if file_duration < sub_duration * 0.7:  # If TTS is much shorter than subtitle duration
+        speed_rate = 0.9  # Slow down slightly but not too much
+        remaining_silence = sub_duration - (file_duration / speed_rate)
+        use_silence = remaining_silence > 0.3  # Only use silence if it's significant
+    else:
+        speed_rate = file_duration / sub_duration if sub_duration > 0 else 1.0
+    return speed_rate, use_silence
+
+class TimelineAssembler:
+    """Assembles speech clips into a single preallocated float32 timeline"""
+    channels = 1
+
+    def __init__(self, sample_rate, duration=0.0, stretch_workers=1, stretch_batch_size=16, path=None):
+        self.sample_rate = sample_rate
+        self.stretch_workers = stretch_workers
+        self.stretch_batch_size = stretch_batch_size
+        # With a path the timeline is a file-backed map the kernel can page out, instead of RAM
+        self.path = path
+        num_samples = int(round(duration * sample_rate))
+        self.buffer = self._map(num_samples, "wb") if path else np.zeros(num_samples, dtype=np.float32)
+        self.length = 0
+        # (start, end) seconds of every placed clip, used to duck the background under speech
+        self.intervals = []
+
+    def _map(self, num_samples, mode):
+        num_samples = max(num_samples, 1)
+        with open(self.path, mode) as f:
+            f.truncate(num_samples * 4)
+        return np.memmap(self.path, dtype=np.float32, mode="r+", shape=(num_samples,))
+
+    def _ensure_capacity(self, num_samples):
+        if num_samples > len(self.buffer):
+            size = max(num_samples, 2 * len(self.buffer))
+            if self.path:
+                self.buffer.flush()
+                self.buffer = self._map(size, "r+b")
+                return
+            grown = np.zeros(size, dtype=np.float32)
+            grown[:len(self.buffer)] = self.buffer
+            self.buffer = grown
+
+    def add_clip(self, samples, start_seconds):
+        """Mix a mono clip into the timeline at the given start time"""
+        offset = int(round(start_seconds * self.sample_rate))
+        end = offset + len(samples)
+        self._ensure_capacity(end)
+        self.buffer[offset:end] += samples
+        self.length = max(self.length, end)
+        self.intervals.append((offset / self.sample_rate, end / self.sample_rate))
+
+    def extend_to(self, seconds):
+        """Make sure the timeline lasts at least until the given time"""
+        num_samples = int(round(seconds * self.sample_rate))
+        self._ensure_capacity(num_samples)
+        self.length = max(self.length, num_samples)
+
+    def _load_speech_clip(self, speech_data):
+        """Read a TTS clip at the timeline rate and work out its speed factor"""
+        start_time = time_to_seconds(speech_data['start'])
+        end_time = time_to_seconds(speech_data['end'])
+
+        samples, clip_rate = read_wav(speech_data['file'])
+        samples = resample(to_mono(samples), clip_rate, self.sample_rate)
+        file_duration = len(samples) / self.sample_rate
+
+        speed_rate, _ = plan_speech_timing(file_duration, end_time - start_time)
+        return samples, speed_rate, start_time, end_time
+
+    def add_speech_clip(self, speech_data):
+        """Load, time-stretch and place a TTS clip from speech file metadata"""
+        samples, speed_rate, start_time, end_time = self._load_speech_clip(speech_data)
+        self.add_clip(time_stretch(samples, speed_rate), start_time)
+        self.extend_to(end_time)
+
+    def add_speech_clips(self, speech_files):
+        """Place every clip from an iterable of speech file metadata, reporting failures"""
+        placed = []
+        # Clips are stretched a batch at a time so the stretcher can vectorize across them
+        for batch in chunked(speech_files, self.stretch_batch_size * max(1, self.stretch_workers)):
+            loaded = []
+            for speech_data in batch:
+                try:
+                    loaded.append((speech_data,) + self._load_speech_clip(speech_data))
+                except (OSError, ValueError) as e:
+                    print(f"Error placing speech clip {speech_data['file']}: {e}")
+
+            stretched = time_stretch_batch(
+                [clip[1] for clip in loaded], [clip[2] for clip in loaded],
+                workers=self.stretch_workers, batch_size=self.stretch_batch_size
+            )
+            for (speech_data, _, _, start_time, end_time), samples in zip(loaded, stretched):
+                self.add_clip(samples, start_time)
+                self.extend_to(end_time)
+                placed.append(speech_data)
+        return placed
+
+    def samples(self):
+        """The assembled timeline as a float32 array"""
+        return self.buffer[:self.length]
+
+    @property
+    def num_frames(self):
+        return self.length
+
+    def read(self, start, count):
+        """Return up to count samples from start as a float32 array of shape (frames, 1), like WavReader"""
+        return np.array(self.buffer[start:min(start + count, self.length)])[:, None]
+
+    def write(self, output_file):
+        """Write the assembled timeline as a single WAV file"""
+        block = self.sample_rate * 10
+        with WavWriter(output_file, self.sample_rate, 1) as writer:
+            for start in range(0, self.length, block):
+                writer.write(self.read(start, block))
+        return output_file
+
+    def release(self):
+        """Free the timeline once it has been mixed or written, deleting its backing file"""
+        # Dropping the map before unlinking lets the file go on every platform
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.length = 0
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def new_speech_timeline(config, duration):
+    """An empty timeline for the given duration, file-backed when it is longer than config allows in RAM"""
+    path = None
+    if duration > getattr(config, "timeline_memmap_seconds", float("inf")):
+        path = os.path.join(config.audio_path, "speech_timeline.f32")
+    return TimelineAssembler(config.sample_rate, duration, getattr(config, "time_stretch_workers", 1), path=path)
+
+def build_speech_timeline(config, speech_files):
+    """Assemble all speech clips in-process and return the assembler holding the timeline"""
+    duration = max((time_to_seconds(s['end']) for s in speech_files), default=0.0)
+    assembler = new_speech_timeline(config, duration)
+    assembler.add_speech_clips(speech_files)
+    return assembler
+
+def assemble_speech_timeline(config, speech_files):
+    """Assemble all speech clips in-process and write the timeline WAV once"""
+    final_wav_file = os.path.join(config.audio_path, "final_uncompressed.wav")
+    return build_speech_timeline(config, speech_files).write(final_wav_file)
+
+def cue_intervals(speech_files):
+    """(start, end) seconds of every speech clip's cue, to duck the background under a concatenated track"""
+    return [(time_to_seconds(s['start']), time_to_seconds(s['end'])) for s in speech_files]
+
+def concat_speech_clips(config, speech_files):
+    """Assemble speech clips with one ffmpeg call per clip and gap, then concatenate them"""
     audio_path = config.audio_path
+    workers = getattr(config, "subprocess_workers", None)
+    timeout = getattr(config, "subprocess_timeout", None)
     
     final_audio_parts = []
     last_end_time = 0
 
     adjusted_speech_clips = []
+    commands = []
     for speech_data in speech_files:
         start_time = time_to_seconds(speech_data['start'])
         end_time = time_to_seconds(speech_data['end'])
 
         # Get original audio duration and calculate speed adjustment
-        file_duration = get_duration(speech_data['file'])
+        file_duration = get_clip_duration(speech_data)
         
         sub_duration = end_time - start_time
+        speed_rate, use_silence = plan_speech_timing(file_duration, sub_duration)
         
-        # Instead of slowing down audio too much, add silence if needed
-        use_silence = False
-        if file_duration < sub_duration * 0.7:  # If TTS is much shorter than subtitle duration
-            speed_rate = 0.9  # Slow down slightly but not too much
-            remaining_silence = sub_duration - (file_duration / speed_rate)
-            use_silence = remaining_silence > 0.3  # Only use silence if it's significant
-        else:
-            speed_rate = file_duration / sub_duration if sub_duration > 0 else 1.0
-        
-        adjusted_audio_path = adjust_audio_timing(speech_data['file'], start_time, end_time, speed_rate)
+        command, adjusted_audio_path = _adjust_audio_command(speech_data['file'], start_time, end_time, speed_rate)
+        commands.append(command)
         
         adjusted_speech_clips.append({
             'file': adjusted_audio_path,
@@ -91,14 +273,22 @@ def create_adjusted_audio_video(config, speech_files):
             'use_silence': use_silence,
             'original_duration': file_duration
         })
+
+    # Clips are independent, so their ffmpeg calls run side by side; one log per clip
+    log_paths = [clip['file'].replace(".wav", ".log") for clip in adjusted_speech_clips]
+    results = run_commands(commands, workers, timeout, log_paths)
+    for clip, speech_data, result in zip(adjusted_speech_clips, speech_files, results):
+        if not result.ok:
+            print(f"Error adjusting audio: {result.describe()}")
+            clip['file'] = speech_data['file']
     
     # Build final audio with proper timing
+    silences = {}
     for i, clip in enumerate(adjusted_speech_clips):
         # Add silence gap between clips if needed
         if clip['start_seconds'] > last_end_time:
             silence_duration = clip['start_seconds'] - last_end_time
-            silence_file = generate_silence(silence_duration, audio_path)
-            final_audio_parts.append(silence_file)
+            final_audio_parts.append(_queue_silence(silences, silence_duration, audio_path))
         
         final_audio_parts.append(clip['file'])
         
@@ -108,62 +298,129 @@ def create_adjusted_audio_video(config, speech_files):
             expected_duration = clip['end_seconds'] - clip['start_seconds']
             silence_needed = expected_duration - adjusted_duration
             if silence_needed > 0.2:  # Only add if silence is noticeable
-                silence_file = generate_silence(silence_needed, audio_path)
-                final_audio_parts.append(silence_file)
+                final_audio_parts.append(_queue_silence(silences, silence_needed, audio_path))
                 last_end_time = clip['end_seconds']
             else:
                 last_end_time = clip['start_seconds'] + adjusted_duration
         else:
             last_end_time = clip['end_seconds']
 
+    # Each distinct gap length is generated once, all of them concurrently
+    for result in run_commands(list(silences.values()), workers, timeout):
+        if not result.ok:
+            print(f"Error generating silence: {result.describe()}")
+
     # Create uncompressed final audio
     final_wav_file = os.path.join(audio_path, "final_uncompressed.wav")
 
     # Create concat list
-    concat_list_file = "concat_list.txt"
+    concat_list_file = os.path.join(audio_path, "concat_list.txt")
     with open(concat_list_file, "w") as f:
         for part in final_audio_parts:
             f.write(f"file '{part}'\n")
 
     # Use concat filter
-    concat_command = f"ffmpeg -f concat -safe 0 -i {concat_list_file} -c copy {final_wav_file} -y"
-    
-    with open("concat_output.log", "w") as log_file:
-        output_concat = subprocess.run(concat_command, shell=True, stdout=log_file, stderr=log_file)
-
-    if output_concat.returncode != 0:
-        print(f"Error in concat (WAV). Check 'concat_output.log' for details.")
+    concat_command = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", concat_list_file, "-c", "copy", final_wav_file, "-y"]
+    result = run_command(concat_command, timeout, log_path=os.path.join(audio_path, "concat_output.log"))
+    if not result.ok:
+        print(f"Error in concat (WAV): {result.describe()}")
         return None
+    return final_wav_file
 
-    # Mix with background audio
-    final_audio_file = os.path.join(audio_path, "final_audio.aac")
-    if bg_audio_file and os.path.exists(bg_audio_file):
-        mixed_audio_file = os.path.join(audio_path, "mixed_audio.wav")
-        amix_command = f"ffmpeg -i {final_wav_file} -i {bg_audio_file} -filter_complex [0:a][1:a]amix=inputs=2:duration=longest {mixed_audio_file} -y"
+def _queue_silence(silences, duration, output_path):
+    """Note a silence file to generate and return its path; equal lengths share one file"""
+    command, output_file = _silence_command(duration, output_path)
+    silences.setdefault(output_file, command)
+    return output_file
 
-        with open("amix_output.log", "w") as amix_log:
-            output_amix = subprocess.run(amix_command, shell=True, stdout=amix_log, stderr=amix_log)
-        
-        if output_amix.returncode != 0:
-            print("Error mixing audio with background. Using only adjusted speech.")
-            final_audio_file = final_wav_file
-        else:
-            final_audio_file = mixed_audio_file
-    else:
-        aac_command = f"ffmpeg -i {final_wav_file} -c:a aac -strict experimental {final_audio_file} -y"
-        with open("aac_encode.log", "w") as aac_log:
-            output_aac = subprocess.run(aac_command, shell=True, stdout=aac_log, stderr=aac_log)
-        
-        if output_aac.returncode != 0:
-            print(f"Error in AAC encoding. Check 'aac_encode.log' for details.")
+def create_adjusted_audio_video(config, speech_files):
+    """Create final video with adjusted audio timing"""
+    if getattr(config, "timeline_assembler", "numpy") == "ffmpeg":
+        speech_track = concat_speech_clips(config, speech_files)
+        if speech_track is None:
             return None
+        intervals = cue_intervals(speech_files)
+    else:
+        # The timeline is piped straight into ffmpeg, so it never touches the disk
+        speech_track = build_speech_timeline(config, speech_files)
+        intervals = None
+    try:
+        return mix_and_mux(config, [(speech_track, config.target_language, intervals)], config.final_output)
+    finally:
+        if isinstance(speech_track, TimelineAssembler):
+            speech_track.release()
 
-    # Merge audio with video
-    output_video_file = config.final_output
-    command_merge = f"ffmpeg -i {video_file} -i {final_audio_file} -c:v copy -map 0:v -map 1:a {output_video_file} -y"
+def mix_and_mux(config, tracks, output_video_file):
+    """Mix each speech track with the background, encode it and mux it into the video in one ffmpeg pass"""
+    # Tracks are (speech, language, intervals); speech is a WAV path or a TimelineAssembler and
+    # intervals its cue times, or None to use the assembler's. At most one track goes over stdin.
+    bg_audio_file = config.bg_file
+    iso_codes = getattr(config, "language_iso639_2", {})
+    has_background = bool(bg_audio_file) and os.path.exists(bg_audio_file)
+    # The numpy mixer ducks the background under speech and sets the loudness in bounded memory
+    premix = has_background and getattr(config, "background_mixer", "numpy") == "numpy"
 
-    with open("merge_log.log", "w") as merge_log:
-        subprocess.run(command_merge, shell=True, stdout=merge_log, stderr=merge_log)
+    command = ["ffmpeg", "-y", "-i", config.video_file]
+    stdin_chunks = None
+    mixed_files = []
+    try:
+        for speech, language, intervals in tracks:
+            if premix:
+                mixed = mix_track(config, speech, bg_audio_file, intervals)
+                channels = read_wav_info(bg_audio_file)[1]
+                if stdin_chunks is None:
+                    stdin_chunks = (block.astype("<f4", copy=False).tobytes() for block in mixed)
+                    command += ["-f", "f32le", "-ar", str(config.sample_rate), "-ac", str(channels), "-i", "pipe:0"]
+                    continue
+                # Further languages are mixed block by block to 16-bit WAVs, deleted once muxed
+                mixed_file = os.path.join(config.audio_path, f"mixed_{language}.wav")
+                mixed_files.append(mixed_file)
+                with WavWriter(mixed_file, config.sample_rate, channels, bits=16) as writer:
+                    for block in mixed:
+                        writer.write(block)
+                command += ["-i", mixed_file]
+            elif isinstance(speech, TimelineAssembler):
+                if stdin_chunks is not None:
+                    raise ValueError("Only one speech track can be piped to ffmpeg")
+                block = speech.sample_rate * 10
+                stdin_chunks = (speech.read(i, block).astype("<f4", copy=False).tobytes()
+                                for i in range(0, speech.length, block))
+                command += ["-f", "f32le", "-ar", str(speech.sample_rate), "-ac", "1", "-i", "pipe:0"]
+            else:
+                command += ["-i", speech]
 
+        filters = []
+        outputs = [f"{i + 1}:a" for i in range(len(tracks))]
+        if has_background and not premix:
+            bg_index = len(tracks) + 1
+            command += ["-i", bg_audio_file]
+            # Mix with background audio; every language gets its own copy of the background
+            splits = "".join(f"[bg{i}]" for i in range(len(tracks)))
+            filters.append(f"[{bg_index}:a]asplit={len(tracks)}{splits}")
+            for i in range(len(tracks)):
+                filters.append(f"[{i + 1}:a][bg{i}]amix=inputs=2:duration=longest[a{i}]")
+            outputs = [f"[a{i}]" for i in range(len(tracks))]
+        if filters:
+            command += ["-filter_complex", ";".join(filters)]
+
+        command += ["-map", "0:v"]
+        for output in outputs:
+            command += ["-map", output]
+        command += ["-c:v", "copy", "-c:a", "aac"]
+        for i, (_, language, _) in enumerate(tracks):
+            command += [f"-metadata:s:a:{i}", f"language={iso_codes.get(language, language)}",
+                        f"-metadata:s:a:{i}", f"title={language}"]
+        command += ["-disposition:a:0", "default", output_video_file]
+
+        # Logs live next to the output so concurrent jobs never share a file
+        log_path = os.path.splitext(output_video_file)[0] + "_ffmpeg.log"
+        result = run_command(command, getattr(config, "subprocess_timeout", None), log_path, stdin_chunks)
+    finally:
+        for mixed_file in mixed_files:
+            if os.path.exists(mixed_file):
+                os.remove(mixed_file)
+    if not result.ok:
+        print(f"Error mixing and muxing audio: {result.describe()}")
+        return None
     print(f"Video with adjusted audio created: {output_video_file}")
     return output_video_file
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import unicodedata
+
+def normalize_text(text):
+    """Normalize text so that trivially different strings share a cache entry"""
+    return ' '.join(unicodedata.normalize("NFC", text).split())
+
+def report_cache_stats(label, hits, misses):
+    """Print hit/miss counts for a cache"""
+    total = hits + misses
+    rate = 100.0 * hits / total if total else 0.0
+    print(f"{label}: {hits} hits, {misses} misses ({rate:.1f}% hit rate)")
+
+# Bytes held by each clip cache directory, measured on the first store and then
+# kept up to date by every TTSClipCache in the process that uses the directory
+_cache_sizes = {}
+_cache_sizes_lock = threading.Lock()
+
+class TTSClipCache:
+    """Content-addressed store of generated TTS clips with a size cap and LRU eviction"""
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, speaker, language, sample_rate, model_version):
+        """Hash everything that influences the generated audio"""
+        payload = json.dumps(
+            [normalize_text(text), speaker, language, sample_rate, model_version],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def _entries(self):
+        """Yield (path, size, last_used) for every cached clip"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".wav"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key, output_file):
+        """Copy a cached clip to output_file; return True on a hit"""
+        cached_file = self._path(key)
+        try:
+            shutil.copyfile(cached_file, output_file)
+            # The modification time doubles as the LRU timestamp
+            os.utime(cached_file)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key, audio_file):
+        """Store a generated clip under its key"""
+        cached_file = self._path(key)
+        os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+        tmp_file = f"{cached_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(audio_file, tmp_file)
+        with _cache_sizes_lock:
+            size_key = os.path.abspath(self.cache_dir)
+            if size_key not in _cache_sizes:
+                _cache_sizes[size_key] = sum(size for _, size, _ in self._entries())
+            # Overwriting a key replaces its old clip, so only the difference is added
+            try:
+                replaced_size = os.path.getsize(cached_file)
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_file, cached_file)
+            _cache_sizes[size_key] += os.path.getsize(cached_file) - replaced_size
+            if _cache_sizes[size_key] > self.max_bytes:
+                _cache_sizes[size_key] = self._evict()
+
+    def _evict(self):
+        """Remove least recently used clips until the cache is under 90% of its cap; return the size left"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except FileNotFoundError:
+                pass
+        return size
+
+    def report(self):
+        """Print cache hit/miss counts"""
+        report_cache_stats("TTS clip cache", self.hits, self.misses)
+
+class TranslationCache:
+    """Persistent (source text, target language) -> translation store"""
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "source TEXT NOT NULL, language TEXT NOT NULL, translation TEXT NOT NULL, "
+                "PRIMARY KEY (source, language))"
+            )
+
+    def get_many(self, texts, language):
+        """Return a {source text: translation} dict for the texts that are cached"""
+        found = {}
+        texts = list(texts)
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(texts), 500):
+                chunk = texts[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, translation FROM translations WHERE language = ? AND source IN ({placeholders})",
+                    [language] + chunk
+                )
+                found.update(rows)
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, translations, language):
+        """Store a {source text: translation} dict"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (source, language, translation) VALUES (?, ?, ?)",
+                [(source, language, translation) for source, translation in translations.items()]
+            )
+
+    def report(self):
+        """Print cache hit/miss counts"""
+        report_cache_stats("Translation cache", self.hits, self.misses)
@@ -0,0 +1,151 @@
+import re
+import numpy as np
+
+# HH:MM:SS.mmm or MM:SS.mmm, with a dot (VTT) or a comma (SRT) before the milliseconds
+_TIMESTAMP = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})')
+
+def parse_timestamp(text):
+    """Parse a VTT/SRT timestamp into integer milliseconds"""
+    match = _TIMESTAMP.match(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid cue timestamp '{text}'")
+    hours, minutes, seconds, milliseconds = match.groups()
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+def format_timestamp(milliseconds):
+    """Format integer milliseconds as an HH:MM:SS,mmm cue timestamp"""
+    milliseconds = max(0, int(milliseconds))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+class CueTable:
+    """Cues stored as columns: integer millisecond start/end arrays and a list of texts"""
+    __slots__ = ("start_ms", "end_ms", "texts")
+
+    def __init__(self, start_ms, end_ms, texts):
+        self.start_ms = np.asarray(start_ms, dtype=np.int64)
+        self.end_ms = np.asarray(end_ms, dtype=np.int64)
+        self.texts = list(texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def from_dicts(cls, subtitles):
+        """Build a table from the list-of-dicts shape passed between pipeline stages"""
+        return cls(
+            [parse_timestamp(subtitle['start']) for subtitle in subtitles],
+            [parse_timestamp(subtitle['end']) for subtitle in subtitles],
+            [subtitle['text'] for subtitle in subtitles],
+        )
+
+    def to_dicts(self):
+        """Serialize to the list-of-dicts shape with 1-based indexes and HH:MM:SS,mmm strings"""
+        return [
+            {'index': i + 1, 'start': format_timestamp(start), 'end': format_timestamp(end), 'text': text}
+            for i, (start, end, text) in enumerate(zip(self.start_ms.tolist(), self.end_ms.tolist(), self.texts))
+        ]
+
+    def durations_ms(self):
+        return self.end_ms - self.start_ms
+
+    def gaps_ms(self):
+        """Silence between each cue and the next one"""
+        return self.start_ms[1:] - self.end_ms[:-1]
+
+    def merge(self, joinable, max_duration_ms):
+        """Merge runs of joinable cues into groups no longer than max_duration_ms"""
+        # joinable[i] says whether cue i may continue the group of cue i - 1. A group always keeps
+        # its first cue and ends before the first cue whose end lies beyond start + max_duration_ms.
+        count = len(self)
+        if count == 0:
+            return CueTable([], [], [])
+        joinable = np.asarray(joinable, dtype=bool)
+        # Groups can never extend past the next cue that is not joinable
+        run_ends = np.flatnonzero(~joinable[1:]) + 1
+        run_ends = np.append(run_ends, count)
+
+        firsts = []
+        first = 0
+        for run_end in run_ends.tolist():
+            while first < run_end:
+                firsts.append(first)
+                limit = self.start_ms[first] + max_duration_ms
+                # Scan ahead in small windows so each group costs about its own length
+                cut = first + 1
+                while cut < run_end:
+                    window = self.end_ms[cut:min(cut + 64, run_end)]
+                    over = np.flatnonzero(window > limit)
+                    if len(over):
+                        cut += int(over[0])
+                        break
+                    cut += len(window)
+                first = cut
+        firsts = np.array(firsts, dtype=np.int64)
+        lasts = np.append(firsts[1:], count) - 1
+
+        texts = [' '.join(self.texts[a:b + 1]) for a, b in zip(firsts.tolist(), lasts.tolist())]
+        return CueTable(self.start_ms[firsts], self.end_ms[lasts], texts)
+
+# One cue: timing line (optional hours, optional cue settings) followed by non-empty text lines;
+# whitespace-only lines, as in YouTube auto-captions, belong to the cue
+_CUE = re.compile(
+    r'^[ \t]*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{3})[ \t]+-->[ \t]+((?:\d+:)?\d{1,2}:\d{2}[.,]\d{3})[^\n]*(?:\n|\Z)'
+    r'((?:[^\n]+(?:\n|\Z))*)',
+    re.M
+)
+_BLOCK_SIZE = 1 << 20
+
+# Digit weights of the fixed-width HH:MM:SS.mmm form; separator columns weigh nothing
+_FIXED_WEIGHTS = np.array([36000000, 3600000, 0, 600000, 60000, 0, 10000, 1000, 0, 100, 10, 1], dtype=np.int64)
+
+def _timestamps_ms(stamps):
+    """Convert a list of timestamps to milliseconds, vectorized when they all share the fixed-width form"""
+    joined = ''.join(stamps)
+    if len(joined) == 12 * len(stamps) and joined.isascii():
+        digits = np.frombuffer(joined.encode('ascii'), dtype=np.uint8).reshape(-1, 12)
+        if (digits[:, 2] == ord(':')).all() and (digits[:, 5] == ord(':')).all():
+            return (digits.astype(np.int64) - ord('0')) @ _FIXED_WEIGHTS
+    return np.array([parse_timestamp(stamp) for stamp in stamps], dtype=np.int64)
+
+def _parse_block(text):
+    """Parse every complete cue in a block of text into (start_ms, end_ms, texts)"""
+    matches = _CUE.findall(text)
+    starts = _timestamps_ms([match[0] for match in matches])
+    ends = _timestamps_ms([match[1] for match in matches])
+    texts = [' '.join(match[2].strip().split('\n')) for match in matches]
+    return starts, ends, texts
+
+def _iter_blocks(f):
+    pending = ""
+    while True:
+        block = f.read(_BLOCK_SIZE)
+        at_end = not block
+        text = pending + block
+        if not at_end:
+            # Only complete cues are parsed; the tail after the last blank line waits for the next block
+            cut = text.rfind("\n\n")
+            if cut < 0:
+                pending = text
+                continue
+            text, pending = text[:cut + 2], text[cut + 2:]
+        yield _parse_block(text)
+        if at_end:
+            return
+
+def iter_cues(f):
+    """Yield (start_ms, end_ms, text) from a VTT or SRT file object, reading it in fixed-size blocks"""
+    for starts, ends, texts in _iter_blocks(f):
+        yield from zip(starts.tolist(), ends.tolist(), texts)
+
+def parse_cues(subtitle_file):
+    """Parse a VTT or SRT file into a CueTable"""
+    with open(subtitle_file, "r", encoding="utf-8-sig") as f:
+        blocks = list(_iter_blocks(f))
+    return CueTable(
+        np.concatenate([block[0] for block in blocks]),
+        np.concatenate([block[1] for block in blocks]),
+        [text for block in blocks for text in block[2]],
+    )
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.tracing import span
+
+# Only the end of a command's stderr is kept in its result; a full log file can be requested
+_STDERR_TAIL_BYTES = 64 * 1024
+
+class CommandResult:
+    """Outcome of one external command"""
+    __slots__ = ("command", "returncode", "duration", "stderr", "timed_out", "log_path")
+
+    def __init__(self, command, returncode, duration, stderr, timed_out=False, log_path=None):
+        self.command = command
+        self.returncode = returncode
+        self.duration = duration
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.log_path = log_path
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+    def describe(self):
+        """One-line failure summary for messages"""
+        if self.timed_out:
+            reason = f"timed out after {self.duration:.1f}s"
+        else:
+            reason = f"exited with code {self.returncode}"
+        if self.log_path:
+            return f"{os.path.basename(self.command[0])} {reason}; see '{self.log_path}'"
+        last_line = (self.stderr.strip().splitlines() or [""])[-1]
+        return f"{os.path.basename(self.command[0])} {reason}" + (f": {last_line}" if last_line else "")
+
+def default_workers():
+    """Concurrent commands by default: one per CPU"""
+    return max(1, os.cpu_count() or 1)
+
+def _read_tail(f):
+    f.seek(0, os.SEEK_END)
+    f.seek(max(0, f.tell() - _STDERR_TAIL_BYTES))
+    return f.read().decode("utf-8", errors="replace")
+
+def run_command(command, timeout=None, log_path=None, stdin_chunks=None):
+    """Run an argument list without a shell and return a CommandResult.
+
+    stderr goes to log_path when given (a temporary file otherwise), so a chatty command never
+    blocks on a full pipe while stdin_chunks, an iterable of bytes, is being fed to it.
+    """
+    command = [str(argument) for argument in command]
+    start = time.perf_counter()
+    log_file = open(log_path, "w+b") if log_path else tempfile.TemporaryFile()
+    with log_file, span(os.path.basename(command[0]), "subprocess", command=" ".join(command)) as span_args:
+        try:
+            process = subprocess.Popen(
+                command, stdin=subprocess.PIPE if stdin_chunks is not None else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, stderr=log_file
+            )
+        except OSError as e:
+            # A missing executable reports like a shell would
+            return CommandResult(command, 127, time.perf_counter() - start, str(e), log_path=log_path)
+
+        # The timer also covers a command that stops reading its stdin and blocks the writer
+        timed_out = threading.Event()
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, lambda: (timed_out.set(), process.kill()))
+            timer.daemon = True
+            timer.start()
+        try:
+            if stdin_chunks is not None:
+                try:
+                    for chunk in stdin_chunks:
+                        process.stdin.write(chunk)
+                except BrokenPipeError:
+                    pass  # The command exited early; its stderr says why
+                finally:
+                    try:
+                        process.stdin.close()
+                    except BrokenPipeError:
+                        pass
+            returncode = process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        span_args["returncode"] = returncode
+        return CommandResult(command, returncode, time.perf_counter() - start, _read_tail(log_file),
+                             timed_out.is_set() and returncode < 0, log_path)
+
+def run_commands(commands, workers=None, timeout=None, log_paths=None):
+    """Run independent commands concurrently, at most workers at a time, and return results in order"""
+    if not commands:
+        return []
+    log_paths = log_paths or [None] * len(commands)
+    workers = min(len(commands), workers or default_workers())
+    # The commands do the work; threads only wait on them
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="command") as pool:
+        return list(pool.map(lambda args: run_command(args[0], timeout, args[1]), zip(commands, log_paths)))
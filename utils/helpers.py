@@ -1,34 +1,63 @@
-import subprocess
-import logging
+import hashlib
+import json
+import os
+from itertools import islice
 
-# Configure logging
-logging.basicConfig(
-    filename="debug.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+def chunked(iterable, size):
+    """Yield lists of up to size items from any iterable, including a live stream"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
-def run_subprocess_with_logging(command):
-    """
-    Runs a subprocess command and logs its output for debugging.
-    """
-    logging.info(f"Running command: {' '.join(command)}")
-    try:
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            shell=True
-        )
-        logging.info(f"STDOUT: {result.stdout}")
-        logging.info(f"STDERR: {result.stderr}")
-        logging.info(f"Return code: {result.returncode}")
+# Large media files are fingerprinted from their size, mtime and sampled content
+_FULL_HASH_LIMIT = 64 * 1024 * 1024
+_SAMPLE_SIZE = 4 * 1024 * 1024
+_file_hashes = {}
 
-        if result.returncode != 0:
-            print(f"Splitting audio failed, return code: {result.returncode}")
-            logging.error(f"Command failed with return code {result.returncode}")
-            logging.error(f"Error output: {result.stderr}")
-    except Exception as e:
-        logging.error(f"Exception occurred while running command: {e}")
-        raise
\ No newline at end of file
+def hash_file(path):
+    """Return a content hash of a file, sampling the head and tail of large files"""
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if cache_key in _file_hashes:
+        return _file_hashes[cache_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if stat.st_size <= _FULL_HASH_LIMIT:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        else:
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+            digest.update(f.read(_SAMPLE_SIZE))
+            f.seek(-_SAMPLE_SIZE, os.SEEK_END)
+            digest.update(f.read(_SAMPLE_SIZE))
+    _file_hashes[cache_key] = digest.hexdigest()
+    return _file_hashes[cache_key]
+
+def fingerprint_value(value):
+    """Turn pipeline data into a JSON-able structure where file paths are replaced by content hashes"""
+    if isinstance(value, dict):
+        return {str(k): fingerprint_value(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [fingerprint_value(v) for v in value]
+    if isinstance(value, str) and os.path.isfile(value):
+        return {"file": hash_file(value)}
+    return value
+
+def fingerprint(value):
+    """Return a stable SHA-256 of any JSON-able value"""
+    payload = json.dumps(fingerprint_value(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def collect_file_paths(value):
+    """Return every string in a nested value that names an existing file"""
+    if isinstance(value, dict):
+        return [path for v in value.values() for path in collect_file_paths(v)]
+    if isinstance(value, (list, tuple)):
+        return [path for v in value for path in collect_file_paths(v)]
+    if isinstance(value, str) and os.path.isfile(value):
+        return [value]
+    return []
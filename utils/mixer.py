@@ -0,0 +1,170 @@
+import contextlib
+
+import numpy as np
+
+from utils.wav import WavReader
+
+# BS.1770 gating: 400 ms windows, an absolute gate at -70 and a relative gate 10 LU below the mean
+_GATE_SECONDS = 0.4
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+
+def merge_intervals(intervals, min_gap=0.0):
+    """Sort (start, end) pairs and merge those that overlap or are less than min_gap apart"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start - merged[-1][1] <= min_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def detect_speech_intervals(source, threshold_db=-45.0, window_seconds=0.05, min_gap=0.3, block_seconds=60.0):
+    """Speech regions of a track with no cue times, found block by block from its level"""
+    window = max(1, int(source.sample_rate * window_seconds))
+    block = window * max(1, int(block_seconds / window_seconds))
+    threshold = 10 ** (threshold_db / 10)
+    intervals = []
+    for start in range(0, source.num_frames, block):
+        frames = source.read(start, block)
+        count = -(-len(frames) // window)
+        # The last window is zero-padded, so speech at the very end is still found
+        frames = np.concatenate([frames, np.zeros((count * window - len(frames), frames.shape[1]), dtype=np.float32)])
+        power = np.square(frames, dtype=np.float32).reshape(count, -1).mean(axis=1)
+        for index in np.flatnonzero(power > threshold):
+            seconds = float(start + index * window) / source.sample_rate
+            intervals.append((seconds, seconds + window_seconds))
+    return merge_intervals(intervals, min_gap)
+
+def integrated_loudness(window_powers):
+    """Gated loudness of per-window mean squares summed over channels, or -inf for silence.
+
+    The windows are not K-weighted, so this approximates BS.1770 LUFS, most closely for mixes
+    dominated by speech.
+    """
+    powers = np.asarray(window_powers, dtype=np.float64)
+    powers = powers[powers > 0]
+    loudness = -0.691 + 10 * np.log10(powers) if len(powers) else powers
+    gated = powers[loudness > _ABSOLUTE_GATE]
+    if len(gated) == 0:
+        return float("-inf")
+    relative = -0.691 + 10 * np.log10(gated.mean()) + _RELATIVE_GATE
+    gated = powers[(loudness > _ABSOLUTE_GATE) & (loudness > relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def _read_at_rate(source, start, count, rate):
+    """Read count frames from start at the given rate, resampling linearly if the source runs at another one"""
+    if source.sample_rate == rate:
+        frames = source.read(start, count)
+    else:
+        # Positions are absolute, so consecutive blocks join without seams
+        positions = (start + np.arange(count)) * (source.sample_rate / rate)
+        positions = positions[positions <= source.num_frames - 1]
+        if len(positions) == 0:
+            frames = np.zeros((0, source.channels), dtype=np.float32)
+        else:
+            first = int(positions[0])
+            raw = source.read(first, int(positions[-1]) - first + 2)
+            local = positions - first
+            index = local.astype(np.int64)
+            following = np.minimum(index + 1, len(raw) - 1)
+            fraction = (local - index).astype(np.float32)
+            # Two-tap interpolation; gathering from contiguous channels beats np.interp
+            frames = np.empty((len(positions), raw.shape[1]), dtype=np.float32)
+            for channel in range(raw.shape[1]):
+                samples = np.ascontiguousarray(raw[:, channel])
+                before = samples[index]
+                frames[:, channel] = before + (samples[following] - before) * fraction
+    if len(frames) < count:
+        frames = np.concatenate([frames, np.zeros((count - len(frames), frames.shape[1]), dtype=np.float32)])
+    return frames
+
+def duck_gain(start, count, starts, ends, floor, attack, release):
+    """Background gain for count frames from start: floor inside speech, ramping back to 1 outside it.
+
+    starts and ends are sorted, non-overlapping speech regions in frames; the gain ramps down over
+    attack frames before each region and back up over release frames after it.
+    """
+    weight = np.zeros(count, dtype=np.float32)
+    attack, release = max(attack, 1), max(release, 1)
+    first = np.searchsorted(ends + release, start, side="right")
+    last = np.searchsorted(starts - attack, start + count, side="left")
+    for region_start, region_end in zip(starts[first:last], ends[first:last]):
+        lo = max(0, region_start - attack - start)
+        hi = min(count, region_end + release - start)
+        t = np.arange(start + lo, start + hi, dtype=np.float64)
+        ramp = np.minimum((t - (region_start - attack)) / attack, (region_end + release - t) / release)
+        np.maximum(weight[lo:hi], np.clip(ramp, 0.0, 1.0), out=weight[lo:hi])
+    return 1.0 - (1.0 - floor) * weight
+
+def mix_blocks(speech, background, intervals, sample_rate, duck_db=-12.0, attack=0.15, release=0.4,
+               target_lufs=-16.0, ceiling=0.97, block_seconds=10.0):
+    """Yield speech mixed over a ducked background as float32 (frames, channels) blocks.
+
+    speech and background are WavReader-like sources (read, num_frames, sample_rate, channels), so
+    only one block of each is in memory at a time. A first pass measures the mix's loudness and
+    peak, and the second yields it with one gain that reaches target_lufs without exceeding the
+    ceiling; target_lufs None keeps the levels as they are.
+    """
+    gate = int(round(sample_rate * _GATE_SECONDS))
+    block = gate * max(1, int(round(block_seconds / _GATE_SECONDS)))
+    num_frames = max(int(np.ceil(source.num_frames * sample_rate / source.sample_rate))
+                     for source in (speech, background))
+    starts = np.array([int(round(start * sample_rate)) for start, _ in intervals], dtype=np.int64)
+    ends = np.array([int(round(end * sample_rate)) for _, end in intervals], dtype=np.int64)
+    floor = 10 ** (duck_db / 20)
+    attack, release = int(attack * sample_rate), int(release * sample_rate)
+
+    def mixed(start):
+        count = min(block, num_frames - start)
+        voice = _read_at_rate(speech, start, count, sample_rate)
+        music = _read_at_rate(background, start, count, sample_rate)
+        music *= duck_gain(start, count, starts, ends, floor, attack, release)[:, None]
+        # A mono voice is added to every background channel
+        music += voice if voice.shape[1] in (1, music.shape[1]) else voice.mean(axis=1, keepdims=True)
+        return music
+
+    gain = 1.0
+    if target_lufs is not None:
+        window_powers, peak = [], 0.0
+        for start in range(0, num_frames, block):
+            frames = mixed(start)
+            peak = max(peak, float(np.abs(frames).max(initial=0.0)))
+            whole = len(frames) // gate * gate
+            squares = np.square(frames, dtype=np.float32)
+            window_powers.append(squares[:whole].reshape(-1, gate, frames.shape[1]).mean(axis=1).sum(axis=1))
+            if whole < len(frames):
+                window_powers.append(squares[whole:].mean(axis=0, keepdims=True).sum(axis=1))
+        loudness = integrated_loudness(np.concatenate(window_powers)) if window_powers else float("-inf")
+        if np.isfinite(loudness):
+            gain = 10 ** ((target_lufs - loudness) / 20)
+        if peak > 0:
+            gain = min(gain, ceiling / peak)
+
+    for start in range(0, num_frames, block):
+        frames = mixed(start)
+        if gain != 1.0:
+            frames *= gain
+        yield frames
+
+def _open_source(speech):
+    # A path is read from disk; anything else, such as a TimelineAssembler, is a source already
+    return WavReader(speech) if isinstance(speech, str) else contextlib.nullcontext(speech)
+
+def mix_track(config, speech, bg_file, intervals=None):
+    """Yield the mix of a speech track, a WAV path or a TimelineAssembler, with the background file"""
+    with _open_source(speech) as speech_source, WavReader(bg_file) as background:
+        # Cue times are used when known: passed in, or carried by a TimelineAssembler.
+        # Only a track with neither is gated on its own level.
+        if intervals is None:
+            intervals = getattr(speech_source, "intervals", None)
+        if intervals is None:
+            intervals = detect_speech_intervals(speech_source)
+        yield from mix_blocks(
+            speech_source, background, merge_intervals(intervals), config.sample_rate,
+            duck_db=getattr(config, "duck_db", -12.0),
+            attack=getattr(config, "duck_attack", 0.15),
+            release=getattr(config, "duck_release", 0.4),
+            target_lufs=getattr(config, "loudness_target", -16.0),
+            block_seconds=getattr(config, "mix_block_seconds", 10.0),
+        )
@@ -0,0 +1,134 @@
+"""Local model registry: Silero and Demucs weights resolved from an on-disk cache without network calls"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+
+LOCK_FILE = "models.lock.json"
+
+# Demucs models as the files demucs.pretrained expects in a local repo: the bag's YAML and its checkpoints
+DEMUCS_FILES = {
+    "htdemucs": {
+        "htdemucs.yaml": "https://raw.githubusercontent.com/facebookresearch/demucs/main/demucs/remote/htdemucs.yaml",
+        "955717e8-8726e21a.th": "https://dl.fbaipublicfiles.com/demucs/hybrid_transformer/955717e8-8726e21a.th",
+    },
+}
+
+_lock = threading.Lock()
+
+class ModelNotCached(Exception):
+    pass
+
+def silero_name(tts_lang, model_version):
+    return f"silero/{model_version}_{tts_lang}"
+
+def demucs_name(model_name):
+    return f"demucs/{model_name}"
+
+def model_files(name):
+    """Map each file of a registered model to the URL it is fetched from"""
+    family, _, model = name.partition("/")
+    if family == "silero":
+        tts_lang = model.split("_", 1)[-1]
+        return {f"{model}.pt": f"https://models.silero.ai/models/tts/{tts_lang}/{model}.pt"}
+    if family == "demucs" and model in DEMUCS_FILES:
+        return DEMUCS_FILES[model]
+    raise ModelNotCached(f"No registry entry for model '{name}'")
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_lock(models_dir):
+    path = os.path.join(models_dir, LOCK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def resolve(name, models_dir):
+    """Directory holding a pinned model, checked against the lock file without touching the network"""
+    model_dir = os.path.join(models_dir, name)
+    pinned = _read_lock(models_dir).get(name)
+    if pinned is None:
+        raise ModelNotCached(f"Model '{name}' is not in {models_dir}; fetch it with "
+                             f"'python -m utils.models fetch {name} --models-dir {models_dir}'")
+    for file_name, entry in pinned["files"].items():
+        path = os.path.join(model_dir, file_name)
+        # Sizes are checked on every load; full hashes only by 'verify', as checkpoints are large
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            raise ModelNotCached(f"Model file {path} is missing or does not match {LOCK_FILE}")
+    return model_dir
+
+def fetch(name, models_dir):
+    """Download a model into the cache and pin the size and SHA-256 of each file"""
+    model_dir = os.path.join(models_dir, name)
+    os.makedirs(model_dir, exist_ok=True)
+    files = {}
+    for file_name, url in model_files(name).items():
+        path = os.path.join(model_dir, file_name)
+        print(f"Fetching {url}")
+        with urllib.request.urlopen(url) as response, \
+                tempfile.NamedTemporaryFile(dir=model_dir, delete=False) as tmp:
+            shutil.copyfileobj(response, tmp)
+        os.replace(tmp.name, path)
+        files[file_name] = {"url": url, "size": os.path.getsize(path), "sha256": _sha256(path)}
+
+    with _lock:
+        lock = _read_lock(models_dir)
+        lock[name] = {"files": files}
+        tmp_path = os.path.join(models_dir, f"{LOCK_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(lock, f, indent=2)
+        os.replace(tmp_path, os.path.join(models_dir, LOCK_FILE))
+    return model_dir
+
+def verify(name, models_dir):
+    """Check every file of a cached model against its pinned SHA-256"""
+    model_dir = resolve(name, models_dir)
+    pinned = _read_lock(models_dir)[name]
+    return all(_sha256(os.path.join(model_dir, file_name)) == entry["sha256"]
+               for file_name, entry in pinned["files"].items())
+
+def load_silero(tts_lang, model_version, models_dir):
+    """Load a cached Silero TTS package"""
+    from torch.package import PackageImporter
+    model_dir = resolve(silero_name(tts_lang, model_version), models_dir)
+    importer = PackageImporter(os.path.join(model_dir, f"{model_version}_{tts_lang}.pt"))
+    return importer.load_pickle("tts_models", "model")
+
+def load_demucs(model_name, models_dir):
+    """Load a cached pretrained Demucs model"""
+    from pathlib import Path
+    from demucs.pretrained import get_model
+    return get_model(model_name, repo=Path(resolve(demucs_name(model_name), models_dir)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.models", description="Manage the local model cache")
+    parser.add_argument("command", choices=["fetch", "verify", "list"])
+    parser.add_argument("names", nargs="*", help="Models such as silero/v3_tt or demucs/htdemucs")
+    parser.add_argument("--models-dir", default=os.path.join("downloads", "cache", "models"),
+                        help="Model cache (default: downloads/cache/models)")
+    args = parser.parse_args(argv)
+    models_dir = args.models_dir
+
+    if args.command == "list":
+        for name, entry in sorted(_read_lock(models_dir).items()):
+            size = sum(file["size"] for file in entry["files"].values())
+            print(f"{name:<24} {size / 1e6:8.1f} MB")
+        return
+    for name in args.names:
+        if args.command == "fetch":
+            print(f"{name}: cached in {fetch(name, models_dir)}")
+        else:
+            print(f"{name}: {'ok' if verify(name, models_dir) else 'CHECKSUM MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
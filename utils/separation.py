@@ -0,0 +1,224 @@
+import multiprocessing
+import threading
+from itertools import islice
+import numpy as np
+
+from utils.cues import parse_cues
+from utils.models import ModelNotCached, load_demucs
+from utils.wav import WavReader, WavWriter
+
+# Loaded models stay warm for the lifetime of the process (or pool worker)
+_models = {}
+_models_lock = threading.Lock()
+
+# Gaps between speech regions shorter than this are separated rather than passed through
+_MIN_PASSTHROUGH_SECONDS = 1.0
+
+def get_demucs_model(model_name, models_dir=None, offline=False):
+    """Load a pretrained Demucs model once per process and reuse it afterwards"""
+    import torch
+
+    with _models_lock:
+        if model_name not in _models:
+            model = None
+            if models_dir:
+                try:
+                    model = load_demucs(model_name, models_dir)
+                except ModelNotCached:
+                    if offline:
+                        raise
+            if model is None:
+                from demucs.pretrained import get_model
+                model = get_model(model_name)
+            model.to(torch.device('cpu'))
+            model.eval()
+            _models[model_name] = model
+        return _models[model_name]
+
+def _mix_stats(reader, block_frames):
+    """Mean and standard deviation of the mono mix, computed in one streaming pass"""
+    total = total_sq = 0.0
+    for start in range(0, reader.num_frames, block_frames):
+        mono = reader.read(start, block_frames).mean(axis=1, dtype=np.float64)
+        total += mono.sum()
+        total_sq += np.square(mono).sum()
+    count = max(1, reader.num_frames)
+    mean = total / count
+    std = float(np.sqrt(max(total_sq / count - mean * mean, 0.0)))
+    return mean, std if std > 1e-8 else 1.0
+
+def _fit_length(samples, length):
+    """Trim or zero-pad a (frames, channels) array to an exact number of frames"""
+    if len(samples) >= length:
+        return samples[:length]
+    return np.pad(samples, ((0, length - len(samples)), (0, 0)))
+
+def _separate_chunk(model, audio_file, start, end, stats):
+    """Separate input frames [start, end) into (vocals, background) in the input's rate and channel layout"""
+    import torch
+    from demucs.apply import apply_model
+    from demucs.audio import convert_audio
+
+    with WavReader(audio_file) as reader:
+        samples = reader.read(start, end - start)
+        input_rate, channels = reader.sample_rate, reader.channels
+
+    wav = torch.from_numpy(np.ascontiguousarray(samples.T))
+    wav = convert_audio(wav, input_rate, model.samplerate, model.audio_channels)
+    # Normalize with whole-track statistics so every chunk sees the same gain as a full-file run
+    mean, std = stats
+    wav = (wav - mean) / std
+    with torch.no_grad():
+        sources = apply_model(model, wav[None], shifts=0, split=True, overlap=0.25, progress=False)[0]
+    sources = sources * std + mean
+
+    vocals = sources[model.sources.index("vocals")]
+    background = sources.sum(dim=0) - vocals
+    stems = []
+    for stem in (vocals, background):
+        stem = convert_audio(stem, model.samplerate, input_rate, channels)
+        stems.append(_fit_length(stem.T.numpy(), end - start))
+    return tuple(stems)
+
+_worker_model = None
+
+def _init_separation_worker(model_name, threads_per_worker, models_dir, offline):
+    """Load the model once per pool worker"""
+    import torch
+
+    global _worker_model
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = get_demucs_model(model_name, models_dir, offline)
+
+def _separate_chunk_task(task):
+    return _separate_chunk(_worker_model, *task)
+
+def _plan_chunks(start, end, chunk_frames, overlap_frames):
+    """Return (start, end) frame ranges of overlapping chunks covering [start, end)"""
+    chunks = []
+    for chunk_start in range(start, max(end, start + 1), chunk_frames):
+        chunk_end = min(chunk_start + chunk_frames + overlap_frames, end)
+        chunks.append((chunk_start, chunk_end))
+        if chunk_end == end:
+            break
+    return chunks
+
+def _stitch_chunks(chunks, results):
+    """Crossfade overlapping chunk results into contiguous (start, vocals, background) blocks"""
+    tail = None
+    for i, (vocals, background) in enumerate(results):
+        start = chunks[i][0]
+        if tail is not None:
+            # Crossfade the region shared with the previous chunk
+            overlap = len(tail[0])
+            fade = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None]
+            vocals[:overlap] = tail[0] * (1.0 - fade) + vocals[:overlap] * fade
+            background[:overlap] = tail[1] * (1.0 - fade) + background[:overlap] * fade
+        if i + 1 < len(chunks):
+            keep = chunks[i + 1][0] - start
+            tail = (vocals[keep:], background[keep:])
+            vocals, background = vocals[:keep], background[:keep]
+        yield start, vocals, background
+
+def speech_regions(subtitle_file, sample_rate, num_frames, padding, crossfade):
+    """Frame ranges around subtitle cues that need separating, padded and merged"""
+    regions = []
+    cues = parse_cues(subtitle_file)
+    margin = padding + crossfade
+    starts = np.maximum(0, ((cues.start_ms / 1000.0 - margin) * sample_rate).astype(np.int64))
+    ends = np.minimum(num_frames, ((cues.end_ms / 1000.0 + margin) * sample_rate).astype(np.int64))
+    # Merging only looks at the previous region, so cues must be in start order
+    order = np.argsort(starts, kind="stable")
+    for start, end in zip(starts[order].tolist(), ends[order].tolist()):
+        if end <= start:
+            continue
+        if regions and start - regions[-1][1] < _MIN_PASSTHROUGH_SECONDS * sample_rate:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [tuple(region) for region in regions]
+
+def _edge_weights(region_start, region_end, block_start, block_length, fade_frames, num_frames):
+    """Blend weights of the separated stems, ramping in and out where the region meets pass-through audio"""
+    positions = np.arange(block_start, block_start + block_length)
+    weights = np.ones(block_length, dtype=np.float32)
+    if fade_frames > 0 and region_start > 0:
+        weights = np.minimum(weights, (positions - region_start + 1) / fade_frames)
+    if fade_frames > 0 and region_end < num_frames:
+        weights = np.minimum(weights, (region_end - positions) / fade_frames)
+    return np.clip(weights, 0.0, 1.0).astype(np.float32)[:, None]
+
+def separate_demucs(config, subtitle_file=None):
+    """Split original audio into voice and background with an in-process Demucs model, chunk by chunk"""
+    model_name = getattr(config, "demucs_model", "htdemucs")
+    models_dir = getattr(config, "models_dir", None)
+    offline = getattr(config, "offline_models", False)
+    workers = getattr(config, "separation_workers", 1)
+    audio_file = config.original_audio_file
+
+    reader = WavReader(audio_file)
+    input_rate, channels, num_frames = reader.sample_rate, reader.channels, reader.num_frames
+    chunk_frames = int(getattr(config, "separation_chunk_seconds", 30) * input_rate)
+    overlap_frames = int(getattr(config, "separation_overlap_seconds", 1.0) * input_rate)
+    fade_frames = int(getattr(config, "separation_mask_crossfade", 0.1) * input_rate)
+    stats = _mix_stats(reader, chunk_frames)
+
+    # With a speech mask only the audio around cues is separated; the rest passes through as background
+    if getattr(config, "separation_mask", False) and subtitle_file:
+        regions = speech_regions(
+            subtitle_file, input_rate, num_frames,
+            getattr(config, "separation_mask_padding", 0.5), getattr(config, "separation_mask_crossfade", 0.1)
+        )
+    else:
+        regions = [(0, num_frames)]
+        fade_frames = 0
+
+    region_chunks = [_plan_chunks(start, end, chunk_frames, overlap_frames) for start, end in regions]
+    tasks = [(audio_file, start, end, stats) for chunks in region_chunks for start, end in chunks]
+    separated = sum(end - start for start, end in regions)
+    print(f"Separating {separated / input_rate:.1f}s of {num_frames / input_rate:.1f}s of audio "
+          f"in {len(tasks)} chunks with Demucs ({model_name})")
+
+    def write_stems(results):
+        with WavWriter(config.voice_file, input_rate, channels) as voice_writer, \
+                WavWriter(config.bg_file, input_rate, channels) as bg_writer:
+
+            def pass_through(start, end):
+                for block_start in range(start, end, chunk_frames):
+                    block = reader.read(block_start, min(chunk_frames, end - block_start))
+                    voice_writer.write(np.zeros_like(block))
+                    bg_writer.write(block)
+
+            position = 0
+            for (region_start, region_end), chunks in zip(regions, region_chunks):
+                pass_through(position, region_start)
+                for block_start, vocals, background in _stitch_chunks(chunks, islice(results, len(chunks))):
+                    if fade_frames:
+                        weights = _edge_weights(region_start, region_end, block_start,
+                                                len(vocals), fade_frames, num_frames)
+                        original = reader.read(block_start, len(vocals))
+                        vocals = vocals * weights
+                        background = background * weights + original * (1.0 - weights)
+                    voice_writer.write(vocals)
+                    bg_writer.write(background)
+                position = region_end
+            pass_through(position, num_frames)
+
+    try:
+        if workers > 1:
+            # Torch does not survive fork well, so workers are always spawned
+            context = multiprocessing.get_context("spawn")
+            threads_per_worker = getattr(config, "separation_threads_per_worker", 4)
+            with context.Pool(
+                processes=workers,
+                initializer=_init_separation_worker,
+                initargs=(model_name, threads_per_worker, models_dir, offline)
+            ) as pool:
+                write_stems(pool.imap(_separate_chunk_task, tasks))
+        else:
+            model = get_demucs_model(model_name, models_dir, offline) if tasks else None
+            write_stems(_separate_chunk(model, *task) for task in tasks)
+    finally:
+        reader.close()
+
+    return config.voice_file, config.bg_file
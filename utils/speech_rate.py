@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+
+from utils.cache import normalize_text
+
+# Used until a language/speaker pair has enough calibration clips
+DEFAULT_SECONDS_PER_CHAR = 0.07
+DEFAULT_INTERCEPT = 0.15
+MIN_CALIBRATION_CLIPS = 5
+
+# Silero SSML prosody presets and their initial speed-up guesses; each preset's own duration fit replaces them
+PROSODY_RATES = {"medium": 1.0, "fast": 1.2, "x-fast": 1.45}
+
+_save_lock = threading.Lock()
+
+def text_length(text):
+    return len(normalize_text(text or ""))
+
+class _LinearFit:
+    """Running least-squares fit of duration = intercept + slope * characters"""
+    def __init__(self, stats=None):
+        self.stats = dict(stats or {"n": 0, "x": 0.0, "y": 0.0, "xx": 0.0, "xy": 0.0})
+
+    def add(self, x, y):
+        self.stats["n"] += 1
+        self.stats["x"] += x
+        self.stats["y"] += y
+        self.stats["xx"] += x * x
+        self.stats["xy"] += x * y
+
+    def merge(self, other):
+        for key, value in other.stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+
+    def predict(self, x):
+        n, sx, sy, sxx, sxy = (self.stats[k] for k in ("n", "x", "y", "xx", "xy"))
+        denominator = n * sxx - sx * sx
+        if n < MIN_CALIBRATION_CLIPS or denominator <= 0:
+            return DEFAULT_INTERCEPT + DEFAULT_SECONDS_PER_CHAR * x
+        slope = (n * sxy - sx * sy) / denominator
+        intercept = (sy - slope * sx) / n
+        return max(0.0, intercept + slope * x)
+
+class SpeechRateModel:
+    """Predicts how long a language/speaker pair takes to speak a text, calibrated from earlier runs"""
+    def __init__(self, path, language, speaker):
+        self.path = path
+        self.key = f"{language}/{speaker}"
+        entry = self._load().get(self.key, {})
+        # Target text predicts the TTS clip; source text lets cues be planned before translation
+        self.target = _LinearFit(entry.get("target"))
+        self.source = _LinearFit(entry.get("source"))
+        self.prosody = {label: _LinearFit(stats) for label, stats in entry.get("prosody", {}).items()}
+        self._pending = {"target": _LinearFit(), "source": _LinearFit(), "prosody": {}}
+
+    @classmethod
+    def from_config(cls, config):
+        language = config.target_language
+        return cls(config.speech_rate_file, language, config.speaker_map.get(language, 'random'))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable speech rate file {self.path}: {e}")
+            return {}
+
+    def predict(self, text):
+        """Seconds the translated text takes at the normal speaking rate"""
+        return self.target.predict(text_length(text))
+
+    def predict_source(self, text):
+        """Seconds the translation of a source-language text is expected to take"""
+        return self.source.predict(text_length(text))
+
+    def speedup(self, label, text):
+        """How much faster than normal a prosody preset speaks the text"""
+        fit = self.prosody.get(label)
+        if label == "medium" or fit is None or fit.stats["n"] < MIN_CALIBRATION_CLIPS:
+            return PROSODY_RATES[label]
+        duration = fit.predict(text_length(text))
+        return self.predict(text) / duration if duration > 0 else PROSODY_RATES[label]
+
+    def choose_prosody(self, text, slot_seconds, max_prosody="x-fast"):
+        """Slowest prosody preset that fits the text into its slot, capped at max_prosody"""
+        needed = self.predict(text) / slot_seconds if slot_seconds > 0 else 1.0
+        labels = sorted(PROSODY_RATES, key=lambda label: PROSODY_RATES[label])
+        allowed = labels[:labels.index(max_prosody) + 1] if max_prosody in labels else labels[:1]
+        for label in allowed:
+            if self.speedup(label, text) >= needed:
+                return label
+        return allowed[-1]
+
+    def update(self, speech_files):
+        """Record the measured durations of freshly synthesized clips"""
+        for entry in speech_files:
+            if entry.get('cached') or not entry.get('num_samples') or not entry.get('sample_rate'):
+                continue
+            duration = entry['num_samples'] / entry['sample_rate']
+            prosody = entry.get('prosody', 'medium')
+            if prosody == 'medium':
+                self._pending["target"].add(text_length(entry['text']), duration)
+                self._pending["source"].add(text_length(entry.get('orig_text')), duration)
+            else:
+                self._pending["prosody"].setdefault(prosody, _LinearFit()).add(text_length(entry['text']), duration)
+
+    def save(self):
+        """Merge the pending measurements into the shared calibration file"""
+        with _save_lock:
+            data = self._load()
+            entry = data.setdefault(self.key, {})
+            for name in ("target", "source"):
+                fit = _LinearFit(entry.get(name))
+                fit.merge(self._pending[name])
+                entry[name] = fit.stats
+            prosody = entry.setdefault("prosody", {})
+            for label, pending in self._pending["prosody"].items():
+                fit = _LinearFit(prosody.get(label))
+                fit.merge(pending)
+                prosody[label] = fit.stats
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        self._pending = {"target": _LinearFit(), "source": _LinearFit(), "prosody": {}}
@@ -1,25 +1,12 @@
 import re
+import numpy as np
 from num2words import num2words
 
+from utils.cues import CueTable, format_timestamp, parse_cues, parse_timestamp
+
 def parse_vtt(subtitle_file):
     """Parse VTT subtitle file into structured format"""
-    with open(subtitle_file, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    pattern = re.compile(r'(\d{2}:\d{2}:\d{2}\.\d{3}) --> (\d{2}:\d{2}:\d{2}\.\d{3})\n(.*?)\n\n', re.DOTALL)
-    matches = pattern.findall(content)
-
-    subtitles = []
-    for index, match in enumerate(matches):
-        start, end, text = match
-        subtitles.append({
-            'index': index + 1,
-            'start': start.replace('.', ','),
-            'end': end.replace('.', ','),
-            'text': text.replace('\n', ' ')
-        })
-
-    return subtitles
+    return parse_cues(subtitle_file).to_dicts()
 
 def convert_num_to_words(utterance):
     """Convert numeric values to words for better TTS"""
@@ -52,11 +39,97 @@ def is_sentence_start(text):
     """Check if text likely starts a sentence"""
     return bool(re.match(r'^[A-Z]', text.strip()))
 
-def merge_subtitle_segments(subtitles, config):
+def seconds_to_time(seconds):
+    """Format seconds as an HH:MM:SS,mmm cue timestamp"""
+    return format_timestamp(round(seconds * 1000))
+
+def _merge_group(group):
+    return {
+        'index': group[0]['index'],
+        'start': group[0]['start'],
+        'end': group[-1]['end'],
+        'text': ' '.join(item['text'] for item in group)
+    }
+
+def _speech_load(rate_model, text, start, end):
+    """Predicted speaking time of a text relative to its slot; above 1.0 the speech has to be compressed"""
+    slot = end - start
+    return rate_model.predict_source(text) / slot if slot > 0 else float("inf")
+
+# Inline word timings and styling in YouTube auto-captions: <00:00:01.234><c> word</c>
+_WORD_TIMING = re.compile(r'<((?:\d+:)?\d{1,2}:\d{2}\.\d{3})>')
+_TAG = re.compile(r'<[^>]*>')
+# Words of the collapsed transcript kept for matching the lead-in of the next cue
+_ROLLING_TAIL_WORDS = 64
+
+def _word_overlap(previous, words, limit):
+    """Length of the longest prefix of words (at most limit) that repeats the end of previous"""
+    for k in range(min(limit, len(words), len(previous)), 0, -1):
+        if previous[-k:] == words[:k]:
+            return k
+    return 0
+
+def is_rolling_captions(cues):
+    """Detect YouTube auto-captions, whose cues carry word timings and repeat the previous line"""
+    if any(_WORD_TIMING.search(text) for text in cues.texts):
+        return True
+    words = [_TAG.sub('', text).split() for text in cues.texts]
+    repeats = sum(1 for previous, current in zip(words, words[1:])
+                  if current and _word_overlap(previous, current, len(current)) >= min(2, len(current)))
+    return len(cues) > 1 and repeats * 2 >= len(cues) - 1
+
+def normalize_auto_captions(cues):
+    """Strip word-timing tags and collapse rolling auto-caption cues into one cue per newly spoken line"""
+    emitted = []
+    starts, ends, texts = [], [], []
+    for start, end, text in zip(cues.start_ms.tolist(), cues.end_ms.tolist(), cues.texts):
+        # Words before the first timing tag start with the cue; each tag times the words after it
+        parts = _WORD_TIMING.split(text)
+        lead_in = _TAG.sub('', parts[0]).split()
+        timed = [(start, word) for word in lead_in]
+        for stamp, segment in zip(parts[1::2], parts[2::2]):
+            timed.extend((parse_timestamp(stamp), word) for word in _TAG.sub('', segment).split())
+
+        # Timed words are always new; only the lead-in can repeat what earlier cues showed
+        new = timed[_word_overlap(emitted, [word for _, word in timed], len(lead_in)):]
+        if not new:
+            continue
+        emitted = (emitted + [word for _, word in new])[-_ROLLING_TAIL_WORDS:]
+        starts.append(max(start, new[0][0]))
+        ends.append(end)
+        texts.append(' '.join(word for _, word in new))
+
+    normalized = CueTable(starts, ends, texts)
+    # Rolling cues overlap the next line on screen; the spoken line ends where the next one starts
+    if len(normalized) > 1:
+        normalized.end_ms[:-1] = np.maximum(normalized.start_ms[:-1],
+                                            np.minimum(normalized.end_ms[:-1], normalized.start_ms[1:]))
+    return normalized
+
+def merge_cue_table(cues, config):
+    """Merge cues that are part of the same sentence or connected thoughts, vectorized over the table"""
+    if len(cues) == 0:
+        return cues
+    sentence_end = np.array([is_sentence_end(text) for text in cues.texts], dtype=bool)
+    sentence_start = np.array([is_sentence_start(text) for text in cues.texts], dtype=bool)
+    # A cue continues the previous group unless the previous cue ends a sentence,
+    # this one starts a new one and the pause between them is long enough
+    joinable = np.ones(len(cues), dtype=bool)
+    joinable[1:] = (~sentence_end[:-1] | ~sentence_start[1:]
+                    | (cues.gaps_ms() < config.segment_merge_threshold * 1000))
+    return cues.merge(joinable, int(round(config.max_segment_merge_duration * 1000)))
+
+def merge_subtitle_segments(subtitles, config, rate_model=None):
     """Merge subtitle segments that are part of the same sentence or connected thoughts"""
     if not subtitles:
         return subtitles
-    
+    if rate_model is None:
+        return merge_cue_table(CueTable.from_dicts(subtitles), config).to_dicts()
+    return _merge_subtitle_dicts(subtitles, config, rate_model)
+
+def _merge_subtitle_dicts(subtitles, config, rate_model):
+    """Cue-by-cue merge that can also consult a speech rate model"""
+    max_load = getattr(config, "speech_rate_max_speedup", 1.1)
     merged = []
     current_group = [subtitles[0]]
     
@@ -73,49 +146,55 @@ def merge_subtitle_segments(subtitles, config):
         # 1. Previous segment doesn't end a sentence
         # 2. Current segment doesn't start with capital letter
         # 3. Gap between segments is small
-        if (not is_sentence_end(prev['text']) or 
-            not is_sentence_start(current['text']) or 
-            time_gap < config.segment_merge_threshold):
-            
-            # Check if merging would exceed max duration
-            group_start = time_to_seconds(current_group[0]['start'])
-            group_end = time_to_seconds(current['end'])
+        should_merge = (not is_sentence_end(prev['text']) or 
+                        not is_sentence_start(current['text']) or 
+                        time_gap < config.segment_merge_threshold)
             
-            if (group_end - group_start) <= config.max_segment_merge_duration:
-                current_group.append(current)
-            else:
-                # Create merged segment and start new group
-                merged_segment = {
-                    'index': current_group[0]['index'],
-                    'start': current_group[0]['start'],
-                    'end': current_group[-1]['end'],
-                    'text': ' '.join(item['text'] for item in current_group)
-                }
-                merged.append(merged_segment)
-                current_group = [current]
+        # Check if merging would exceed max duration
+        group_start = time_to_seconds(current_group[0]['start'])
+        group_end = time_to_seconds(current['end'])
+        within_max = (group_end - group_start) <= config.max_segment_merge_duration
+
+        # With a speech rate model, merges also respect the predicted speaking time of the translation
+        if rate_model is not None and within_max:
+            group_text = ' '.join(item['text'] for item in current_group)
+            group_load = _speech_load(rate_model, group_text, group_start, prev_end)
+            merged_load = _speech_load(rate_model, f"{group_text} {current['text']}", group_start, group_end)
+            if not should_merge and group_load > max_load and merged_load < group_load:
+                # The group is too long for its slot; merging lends it the following pause
+                should_merge = True
+
+        if should_merge and within_max:
+            current_group.append(current)
         else:
             # Create merged segment and start new group
-            merged_segment = {
-                'index': current_group[0]['index'],
-                'start': current_group[0]['start'],
-                'end': current_group[-1]['end'],
-                'text': ' '.join(item['text'] for item in current_group)
-            }
-            merged.append(merged_segment)
+            merged.append(_merge_group(current_group))
             current_group = [current]
     
     # Add the last group
     if current_group:
-        merged_segment = {
-            'index': current_group[0]['index'],
-            'start': current_group[0]['start'],
-            'end': current_group[-1]['end'],
-            'text': ' '.join(item['text'] for item in current_group)
-        }
-        merged.append(merged_segment)
+        merged.append(_merge_group(current_group))
     
     # Reindex the merged subtitles
     for i, subtitle in enumerate(merged):
         subtitle['index'] = i + 1
+
+    if rate_model is not None:
+        extend_into_pauses(merged, rate_model, config)
     
-    return merged
\ No newline at end of file
+    return merged
+
+def extend_into_pauses(subtitles, rate_model, config):
+    """Move the end of cues predicted to overflow into the pause before the next cue"""
+    margin = getattr(config, "speech_gap_margin", 0.1)
+    for i, subtitle in enumerate(subtitles):
+        start = time_to_seconds(subtitle['start'])
+        end = time_to_seconds(subtitle['end'])
+        wanted_end = start + rate_model.predict_source(subtitle['text'])
+        if wanted_end <= end:
+            continue
+        if i + 1 < len(subtitles):
+            wanted_end = min(wanted_end, time_to_seconds(subtitles[i + 1]['start']) - margin)
+        if wanted_end > end:
+            subtitle['end'] = seconds_to_time(wanted_end)
+    return subtitles
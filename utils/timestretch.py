@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from utils.wav import resample
+
+DEFAULT_FRAME_SIZE = 1024
+
+def _periodic_hann(size):
+    """Hann window whose copies at half-frame hops sum to exactly one"""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(size) / size)).astype(np.float32)
+
+def _overlap_add(frames, hop):
+    """Overlap-add (frames, 2 * hop) rows at a hop of half a frame"""
+    output = np.zeros((len(frames) + 1) * hop, dtype=np.float32)
+    output[:-hop].reshape(-1, hop)[:] = frames[:, :hop]
+    output[hop:].reshape(-1, hop)[:] += frames[:, hop:]
+    return output
+
+def _output_length(num_samples, speed_factor):
+    return int(round(num_samples / speed_factor))
+
+def wsola_batch(clips, speed_factors, frame_size=DEFAULT_FRAME_SIZE):
+    """Time-stretch mono clips by WSOLA, searching the best-aligned frame for every clip at once"""
+    results = [None] * len(clips)
+    jobs = []
+    for i, (clip, speed_factor) in enumerate(zip(clips, speed_factors)):
+        clip = np.asarray(clip, dtype=np.float32)
+        out_length = _output_length(len(clip), speed_factor)
+        if speed_factor == 1.0 or len(clip) == 0:
+            results[i] = clip
+        elif len(clip) < frame_size or out_length < frame_size:
+            # Too short to hold a single frame; plain resampling is inaudible at this length
+            results[i] = resample(clip, len(clip), out_length)
+        else:
+            jobs.append(i)
+    if not jobs:
+        return results
+
+    hop = frame_size // 2
+    tolerance = frame_size // 4
+    speeds = np.array([speed_factors[i] for i in jobs], dtype=np.float64)
+    lengths = np.array([len(clips[i]) for i in jobs])
+    out_lengths = np.array([_output_length(len(clips[i]), speed_factors[i]) for i in jobs])
+    num_frames = -(-(out_lengths - frame_size) // hop) + 1
+
+    # Each clip starts tolerance samples in and is zero-padded far enough for any search window
+    pad_end = 2 * frame_size + 2 * tolerance + int(np.ceil(hop * max(1.0, speeds.max())))
+    padded = np.zeros((len(jobs), tolerance + lengths.max() + pad_end), dtype=np.float32)
+    for row, i in enumerate(jobs):
+        padded[row, tolerance:tolerance + len(clips[i])] = clips[i]
+
+    starts = np.zeros((len(jobs), num_frames.max()), dtype=np.int64)
+    starts[:, 0] = tolerance
+    frame_offsets = np.arange(frame_size)
+    region_offsets = np.arange(frame_size + 2 * tolerance)
+    nfft = 1 << (frame_size + 2 * tolerance - 1).bit_length()
+
+    for k in range(1, num_frames.max()):
+        rows = np.nonzero(num_frames > k)[0]
+        # The natural continuation of the previous frame is the template to match
+        templates = padded[rows[:, None], (starts[rows, k - 1] + hop)[:, None] + frame_offsets]
+        nominal = tolerance + np.round(k * hop * speeds[rows]).astype(np.int64)
+        regions = padded[rows[:, None], (nominal - tolerance)[:, None] + region_offsets]
+        spectrum = np.fft.rfft(regions, nfft, axis=1) * np.conj(np.fft.rfft(templates, nfft, axis=1))
+        correlation = np.fft.irfft(spectrum, nfft, axis=1)[:, :2 * tolerance + 1]
+        starts[rows, k] = nominal - tolerance + np.argmax(correlation, axis=1)
+
+    window = _periodic_hann(frame_size)
+    for row, i in enumerate(jobs):
+        frame_starts = starts[row, :num_frames[row]]
+        frames = padded[row][frame_starts[:, None] + frame_offsets] * window
+        output = _overlap_add(frames, hop)
+        norm = _overlap_add(np.broadcast_to(window, frames.shape), hop)
+        norm[norm < 1e-3] = 1.0
+        results[i] = (output / norm)[:out_lengths[row]]
+    return results
+
+def time_stretch(samples, speed_factor, frame_size=DEFAULT_FRAME_SIZE):
+    """Change the tempo of a mono signal without changing its pitch"""
+    return wsola_batch([samples], [speed_factor], frame_size)[0]
+
+def time_stretch_batch(clips, speed_factors, workers=1, batch_size=16, frame_size=DEFAULT_FRAME_SIZE):
+    """Stretch many clips, grouping clips of similar length and spreading the groups over threads"""
+    order = sorted(range(len(clips)), key=lambda i: len(clips[i]))
+    groups = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    def run_group(group):
+        return wsola_batch([clips[i] for i in group], [speed_factors[i] for i in group], frame_size)
+
+    results = [None] * len(clips)
+    # NumPy releases the GIL inside the FFTs and gathers, so threads run groups in parallel
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for group, stretched in zip(groups, pool.map(run_group, groups)):
+            for i, clip in zip(group, stretched):
+                results[i] = clip
+    return results
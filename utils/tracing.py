@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then left out
+    resource = None
+
+# The tracer spans are recorded into; None while tracing is off, which makes span() nearly free
+_active = None
+# Callables receiving (name, category, seconds, args) for every finished span, e.g. live metrics
+_listeners = []
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def _bytes_written():
+    """Bytes this process has passed to write calls so far, including pipes (Linux only)"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _child_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+class Tracer:
+    """Collects spans from every thread of a run and exports them as Chrome trace events"""
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.pid = os.getpid()
+
+    def add(self, name, category, start, duration, args):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def write_chrome_trace(self, path):
+        """Write a file that chrome://tracing and Perfetto can open"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        thread_names = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": thread.ident, "args": {"name": thread.name}}
+            for thread in threading.enumerate()
+            if any(event["tid"] == thread.ident for event in events)
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": thread_names + events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        """Per-span totals as a text table, followed by the TTS real-time factor"""
+        with self._lock:
+            events = list(self.events)
+        rows = {}
+        for event in events:
+            row = rows.setdefault((event["cat"], event["name"]), {"count": 0, "wall": 0.0, "cpu": 0.0,
+                                                                   "rss": None, "written": 0})
+            args = event["args"]
+            row["count"] += 1
+            row["wall"] += event["dur"] / 1e6
+            row["cpu"] += args.get("cpu_s", 0.0) + args.get("child_cpu_s", 0.0)
+            if args.get("peak_rss_mb") is not None:
+                row["rss"] = max(row["rss"] or 0.0, args["peak_rss_mb"])
+            row["written"] += args.get("bytes_written") or 0
+
+        lines = [f"{'span':<40} {'count':>6} {'wall s':>9} {'cpu s':>9} {'peak MB':>8} {'written MB':>11}"]
+        for (category, name), row in sorted(rows.items(), key=lambda item: -item[1]["wall"]):
+            rss = f"{row['rss']:.0f}" if row["rss"] is not None else "-"
+            lines.append(f"{(category + ':' + name)[:40]:<40} {row['count']:>6} {row['wall']:>9.2f} "
+                         f"{row['cpu']:>9.2f} {rss:>8} {row['written'] / 1e6:>11.1f}")
+
+        tts = [event for event in events if event["cat"] == "tts"]
+        audio_seconds = sum(event["args"].get("audio_seconds", 0.0) for event in tts)
+        if audio_seconds > 0:
+            inference_seconds = sum(event["dur"] for event in tts) / 1e6
+            lines.append(f"TTS real-time factor: {inference_seconds / audio_seconds:.3f} "
+                         f"({inference_seconds:.1f}s of inference for {audio_seconds:.1f}s of speech)")
+        return "\n".join(lines)
+
+@contextmanager
+def span(name, category="stage", **args):
+    """Record wall time, CPU time, peak RSS and bytes written for a block of code.
+
+    Yields the span's args dict, so the block can attach results such as audio_seconds.
+    """
+    tracer = _active
+    if tracer is None and not _listeners:
+        yield args
+        return
+
+    # CPU is that of the calling thread plus any subprocesses reaped meanwhile; peak RSS
+    # and bytes written are process-wide, so concurrent spans see each other's usage
+    written = _bytes_written()
+    child_cpu = _child_cpu()
+    cpu = time.thread_time()
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        duration = time.perf_counter() - start
+        args["cpu_s"] = time.thread_time() - cpu
+        args["child_cpu_s"] = _child_cpu() - child_cpu
+        args["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF) if resource else None
+        if category == "subprocess" and resource is not None:
+            args["child_peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+        if written is not None:
+            args["bytes_written"] = _bytes_written() - written
+        if tracer is not None:
+            tracer.add(name, category, start, duration, args)
+        for listener in list(_listeners):
+            listener(name, category, duration, args)
+
+def add_span_listener(listener):
+    """Call listener(name, category, seconds, args) whenever a span finishes, tracing or not"""
+    _listeners.append(listener)
+
+def remove_span_listener(listener):
+    _listeners.remove(listener)
+
+def start_tracing():
+    """Start collecting spans and return the tracer"""
+    global _active
+    _active = Tracer()
+    return _active
+
+def stop_tracing():
+    """Stop collecting spans and return the tracer that collected them"""
+    global _active
+    tracer, _active = _active, None
+    return tracer
+
+@contextmanager
+def tracing(config):
+    """Trace a run when config.trace_file is set; the trace and a summary table are written at the end"""
+    trace_file = getattr(config, "trace_file", None)
+    if not trace_file or _active is not None:
+        # Nested runs, such as the per-language pipelines, report into the outer trace
+        yield _active
+        return
+
+    tracer = start_tracing()
+    try:
+        yield tracer
+    finally:
+        stop_tracing()
+        tracer.write_chrome_trace(trace_file)
+        print(tracer.summary())
+        print(f"Trace written to {trace_file}")
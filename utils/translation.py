@@ -1,21 +1,101 @@
 import json
 import os
-from googletrans import Translator
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+from utils.cache import TranslationCache
+from utils.helpers import chunked
 from utils.subtitles import convert_num_to_words
+from utils.tracing import span
 
 class GoogleTranslator:
     def __init__(self, config):
         self.config = config
-        self.translator = Translator()
+        # One client per worker thread so each keeps its own pooled connections
+        self._local = threading.local()
+        self.cache = None
+        if getattr(config, "translation_cache_enabled", False):
+            self.cache = TranslationCache(config.translation_cache_file)
+
+    def _client(self):
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            from googletrans import Translator
+            service_urls = getattr(self.config, "google_translate_service_urls", None)
+            translator = Translator(service_urls=service_urls) if service_urls else Translator()
+            self._local.translator = translator
+        return translator
+
+    def _request(self, text):
+        """Send one translation request, retrying with exponential backoff"""
+        retries = getattr(self.config, "google_translate_retries", 3)
+        backoff = getattr(self.config, "google_translate_backoff", 1.0)
+        for attempt in range(retries + 1):
+            try:
+                with span("google_translate", "translation", chars=len(text), attempt=attempt):
+                    return self._client().translate(text, dest=self.config.target_language).text
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = backoff * (2 ** attempt) * (1 + random.random())
+                print(f"Translation request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _translate_batch(self, texts):
+        """Translate texts packed one per line into a single request"""
+        translated = self._request("\n".join(texts)).split("\n")
+        if len(translated) == len(texts):
+            return [text.strip() for text in translated]
+        # The service merged or split lines, so retry each half separately
+        if len(texts) == 1:
+            return [" ".join(translated).strip()]
+        middle = len(texts) // 2
+        return self._translate_batch(texts[:middle]) + self._translate_batch(texts[middle:])
+
+    def _pack(self, texts):
+        """Group texts into batches that stay under the per-request character limit"""
+        max_chars = getattr(self.config, "google_translate_batch_chars", 4000)
+        batches = []
+        batch, batch_chars = [], 0
+        for text in texts:
+            if batch and batch_chars + len(text) + 1 > max_chars:
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text) + 1
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def translate_texts(self, texts):
+        """Translate a list of texts, skipping the network for cached ones"""
+        target_language = self.config.target_language
+        unique_texts = [text for text in dict.fromkeys(texts) if text.strip()]
+        translations = self.cache.get_many(unique_texts, target_language) if self.cache else {}
+        missing = [text for text in unique_texts if text not in translations]
+
+        batches = self._pack(missing)
+        workers = max(1, getattr(self.config, "google_translate_workers", 4))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch, translated in zip(batches, pool.map(self._translate_batch, batches)):
+                batch_translations = dict(zip(batch, translated))
+                translations.update(batch_translations)
+                if self.cache:
+                    self.cache.put_many(batch_translations, target_language)
+
+        return [translations.get(text, "") for text in texts]
         
-    def translate(self, subtitles):
-        """Translate subtitles using Google Translate"""
+    def _translate_cues(self, subtitles):
+        """Translate a list of subtitles into translated cue dicts"""
+        # Newlines are the batch delimiter, so they must not appear inside a cue
+        orig_texts = [convert_num_to_words(subtitle['text']).replace("\n", " ") for subtitle in subtitles]
+        translated_texts = self.translate_texts(orig_texts)
+
         translated_subtitles = []
-        
-        for subtitle in subtitles:
-            orig_text = convert_num_to_words(subtitle['text'])
-            translated_text = self.translator.translate(orig_text, dest=self.config.target_language).text
+        for subtitle, orig_text, translated_text in zip(subtitles, orig_texts, translated_texts):
             translated_subtitles.append({
                 'index': subtitle['index'],
                 'start': subtitle['start'],
@@ -23,25 +103,70 @@ class GoogleTranslator:
                 'text': translated_text,
                 'orig_text': orig_text,
             })
-        
-        # Save translations
+        return translated_subtitles
+
+    def _save_translations(self, translated_subtitles):
+        """Save translations and report cache usage"""
         output_file = os.path.join(self.config.translations_path, f"google_{self.config.target_language}.json")
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(translated_subtitles, f, ensure_ascii=False, indent=2)
-            
+
+        if self.cache:
+            self.cache.report()
+        
+    def translate(self, subtitles):
+        """Translate subtitles using Google Translate"""
+        translated_subtitles = self._translate_cues(subtitles)
+        self._save_translations(translated_subtitles)
         return translated_subtitles
 
+    def translate_stream(self, subtitles):
+        """Translate subtitles chunk by chunk and yield cues in order as soon as each chunk is ready"""
+        chunk_size = getattr(self.config, "stream_chunk_size", 20)
+        workers = max(1, getattr(self.config, "google_translate_workers", 4))
+        translated_subtitles = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunked(subtitles, chunk_size):
+                pending.append(pool.submit(self._translate_cues, chunk))
+                while pending and pending[0].done():
+                    for cue in pending.popleft().result():
+                        translated_subtitles.append(cue)
+                        yield cue
+            while pending:
+                for cue in pending.popleft().result():
+                    translated_subtitles.append(cue)
+                    yield cue
+        self._save_translations(translated_subtitles)
+
+
+import asyncio
+from typing import List, Dict, Optional, Tuple
 
-from google import genai
-from google.genai import Client
-from typing import List, Dict
+from utils.subtitles import time_to_seconds
+
+# Worked examples for the prompt rules, written in the target language
+PROMPT_EXAMPLES = {
+    "tt": {
+        "abbreviations": ['"UK" should be translated as "Бөекбритания".'],
+        "numbers": ['"10%" becomes "ун процент"', '"$5" becomes "биш доллар"'],
+    },
+}
 
 class GoogleGeminiTranslator:
-    def __init__(self, config):
+    def __init__(self, config, client=None):
         """
         Initialize the Google Gemini Translator.
+        :param client: Optional pre-built client, e.g. a fake one that returns canned responses.
         """
         self.config = config
+        self.client = client
+
+    def _get_client(self):
+        if self.client is None:
+            from google.genai import Client
+            self.client = Client(api_key=self.config.google_api_key)
+        return self.client
 
     def translate(self, subtitles: List[Dict]) -> List[Dict]:
         """
@@ -49,23 +174,67 @@ class GoogleGeminiTranslator:
         :param subtitles: List of subtitle dictionaries with 'start', 'end', and 'text'.
         :return: Translated subtitles in the same format as input.
         """
-        # Merge subtitles into a single text with timecodes
-        merged_text = self._merge_subtitles(subtitles)
+        window_size = getattr(self.config, "gemini_window_size", 0)
+        if window_size and len(subtitles) > window_size:
+            translated_subtitles = asyncio.run(self._translate_windowed(subtitles, window_size))
+        else:
+            # Merge subtitles into a single text with timecodes
+            merged_text = self._merge_subtitles(subtitles)
 
-        # Prepare the prompt for the LLM
-        prompt = self._build_prompt(merged_text, self.config.target_language)
+            # Prepare the prompt for the LLM
+            prompt = self._build_prompt(merged_text, self.config.target_language)
 
-        # Call the Gemini API
-        client = Client(api_key=self.config.google_api_key)
-        response = client.models.generate_content(
-            model=self.config.google_model_name,
-            contents=prompt
-        )
+            # Call the Gemini API
+            with span("gemini", "translation", chars=len(prompt)):
+                response = self._get_client().models.generate_content(
+                    model=self.config.google_model_name,
+                    contents=prompt
+                )
 
-        # Parse the response back into subtitle format
-        translated_subtitles = self._parse_translated_vtt(self._clean_webvtt_content(response.text), subtitles)
+            # Parse the response back into subtitle format
+            translated_subtitles = self._parse_translated_vtt(self._clean_webvtt_content(response.text), subtitles)
 
-        # Save the translated subtitles to a file
+        self._save_translations(translated_subtitles)
+        return translated_subtitles
+
+    def translate_stream(self, subtitles):
+        """
+        Translate subtitles and yield cues in order, window by window, while later windows are still in flight.
+        :param subtitles: Iterable of subtitle dictionaries.
+        :return: Generator of translated subtitles.
+        """
+        subtitles = list(subtitles)
+        window_size = getattr(self.config, "gemini_window_size", 0)
+        if not (window_size and len(subtitles) > window_size):
+            yield from self.translate(subtitles)
+            return
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        semaphore = asyncio.Semaphore(max(1, getattr(self.config, "gemini_max_concurrency", 4)))
+        tasks = [
+            loop.create_task(self._translate_window(window_index, window, semaphore))
+            for window_index, window in enumerate(self._split_windows(subtitles, window_size))
+        ]
+        translated_subtitles = []
+        try:
+            for task in tasks:
+                # Waiting on one window keeps the loop, and every other window, running
+                window = loop.run_until_complete(task)
+                yield from self._stitch_window(translated_subtitles, window)
+        finally:
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            asyncio.set_event_loop(None)
+            loop.close()
+        self._save_translations(translated_subtitles)
+
+    def _save_translations(self, translated_subtitles: List[Dict]) -> None:
+        """
+        Save the translated subtitles to a file.
+        :param translated_subtitles: Translated subtitles for the whole video.
+        """
         output_file = os.path.join(
             self.config.translations_path,
             f"google_gemini_{self.config.target_language}.json"
@@ -73,7 +242,90 @@ class GoogleGeminiTranslator:
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(translated_subtitles, f, ensure_ascii=False, indent=2)
 
-        return translated_subtitles
+    def _split_windows(self, subtitles: List[Dict], window_size: int) -> List[Tuple[List[Dict], float, Optional[float]]]:
+        """
+        Split subtitles into windows padded with a few overlapping context cues.
+        :param subtitles: List of subtitle dictionaries.
+        :param window_size: Number of cues each window is responsible for.
+        :return: List of (cues to send, owned start time, owned end time or None for the last window).
+        """
+        overlap = getattr(self.config, "gemini_window_overlap", 3)
+        windows = []
+        for start in range(0, len(subtitles), window_size):
+            end = start + window_size
+            context_cues = subtitles[max(0, start - overlap):end + overlap]
+            owned_start = time_to_seconds(subtitles[start]['start'])
+            owned_end = time_to_seconds(subtitles[end]['start']) if end < len(subtitles) else None
+            windows.append((context_cues, owned_start, owned_end))
+        return windows
+
+    async def _translate_window(self, window_index: int, window, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """
+        Translate one window and keep only the cues that start inside the range it owns.
+        :return: Translated cues owned by this window.
+        """
+        context_cues, owned_start, owned_end = window
+        prompt = self._build_prompt(self._merge_subtitles(context_cues), self.config.target_language)
+        retries = getattr(self.config, "gemini_retries", 2)
+
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    with span("gemini", "translation", chars=len(prompt), window=window_index, attempt=attempt):
+                        response = await self._get_client().aio.models.generate_content(
+                            model=self.config.google_model_name,
+                            contents=prompt
+                        )
+                translated = self._parse_translated_vtt(
+                    self._clean_webvtt_content(response.text), context_cues, window_index=window_index
+                )
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"Gemini window {window_index} failed ({e}), retrying")
+                await asyncio.sleep(2 ** attempt)
+
+        return [
+            cue for cue in translated
+            if owned_start <= time_to_seconds(cue['start']) and (owned_end is None or time_to_seconds(cue['start']) < owned_end)
+        ]
+
+    async def _translate_windowed(self, subtitles: List[Dict], window_size: int) -> List[Dict]:
+        """
+        Translate overlapping windows concurrently and stitch the results by timestamp.
+        :return: Translated subtitles for the whole video.
+        """
+        semaphore = asyncio.Semaphore(max(1, getattr(self.config, "gemini_max_concurrency", 4)))
+        windows = self._split_windows(subtitles, window_size)
+        results = await asyncio.gather(*(
+            self._translate_window(window_index, window, semaphore)
+            for window_index, window in enumerate(windows)
+        ))
+        return self._stitch_windows(results)
+
+    def _stitch_windows(self, window_results: List[List[Dict]]) -> List[Dict]:
+        """
+        Join per-window translations in window order.
+        :return: Reindexed list of translated subtitles.
+        """
+        stitched = []
+        for window in window_results:
+            self._stitch_window(stitched, window)
+        return stitched
+
+    def _stitch_window(self, stitched: List[Dict], window: List[Dict]) -> List[Dict]:
+        """
+        Append one window's cues to the stitched list. Windows keep only the cues that start in
+        the time range they own, so no cue appears twice and cues that overlap in time are kept.
+        :return: The cues that were appended.
+        """
+        added = []
+        for cue in sorted(window, key=lambda cue: time_to_seconds(cue['start'])):
+            cue = dict(cue, index=len(stitched) + 1)
+            stitched.append(cue)
+            added.append(cue)
+        return added
 
     def _merge_subtitles(self, subtitles: List[Dict]) -> str:
         """
@@ -86,16 +338,18 @@ class GoogleGeminiTranslator:
             for subtitle in subtitles
         )
 
-    def _parse_translated_vtt(self, vtt_text: str, original_subtitles: List[Dict]) -> List[Dict]:
+    def _parse_translated_vtt(self, vtt_text: str, original_subtitles: List[Dict], window_index: Optional[int] = None) -> List[Dict]:
         """
         Parse the translated VTT text into the required subtitle format.
         :param vtt_text: Translated VTT text.
         :param original_subtitles: Original subtitles for reference.
+        :param window_index: Window number in windowed mode, used to keep raw responses apart.
         :return: List of translated subtitles in the required format.
         """
+        raw_suffix = "_raw.txt" if window_index is None else f"_raw_{window_index}.txt"
         output_file = os.path.join(
             self.config.translations_path,
-            f"google_gemini_{self.config.target_language}_raw.txt"
+            f"google_gemini_{self.config.target_language}{raw_suffix}"
         )
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(vtt_text)
@@ -140,22 +394,25 @@ class GoogleGeminiTranslator:
         return translated_subtitles
 
     def _build_prompt(self, subtitle_content, target_language):
+        language = getattr(self.config, "language_names", {}).get(target_language, target_language)
+        examples = PROMPT_EXAMPLES.get(target_language, {})
+        abbreviation_examples = "".join(
+            f"\n        - Example: {example}" for example in examples.get("abbreviations", [])
+        )
+        number_examples = "".join(f"\n        - Example: {example}" for example in examples.get("numbers", []))
         prompt = f"""
-    You are a professional subtitle translator and editor working on dubbing videos from English to Tatar. You will be provided with subtitles in WEBVTT format.
+    You are a professional subtitle translator and editor working on dubbing videos from English to {language}. You will be provided with subtitles in WEBVTT format.
 
     Your task:
-    1. Translate each subtitle line from English to Tatar.
+    1. Translate each subtitle line from English to {language}.
     2. Preserve the original WEBVTT timestamp structure.
-    3. If a sentence is split across multiple fragments, merge them into a larger fragment if it improves the flow and keeps the spoken Tatar translation within a similar duration.
-    4. Ensure the Tatar translation would take approximately the same time to speak as the original English fragment to keep it in sync with the video.
-    5. Do not use English words, abbreviations, or symbols in the Tatar translation.
-        - Translate or explain abbreviations and acronyms clearly for a Tatar-speaking audience unfamiliar with them.
-        - Example: "UK" should be translated as "Бөекбритания".
-    6. Write all numbers and symbols (like %, $, €, etc.) as fully written Tatar words.
-        - Example: "10%" becomes "ун процент"
-        - Example: "$5" becomes "биш доллар"
-    7. Use formal, clear, and natural-sounding Tatar phrasing.
-    8. Return the result in WEBVTT format, maintaining timestamps unchanged or adjusting them if merging fragments, and replacing only the subtitle text with its Tatar translation.
+    3. If a sentence is split across multiple fragments, merge them into a larger fragment if it improves the flow and keeps the spoken {language} translation within a similar duration.
+    4. Ensure the {language} translation would take approximately the same time to speak as the original English fragment to keep it in sync with the video.
+    5. Do not use English words, abbreviations, or symbols in the {language} translation.
+        - Translate or explain abbreviations and acronyms clearly for a {language}-speaking audience unfamiliar with them.{abbreviation_examples}
+    6. Write all numbers and symbols (like %, $, €, etc.) as fully written {language} words.{number_examples}
+    7. Use formal, clear, and natural-sounding {language} phrasing.
+    8. Return the result in WEBVTT format, maintaining timestamps unchanged or adjusting them if merging fragments, and replacing only the subtitle text with its {language} translation.
 
     Important:
     If merging fragments, adjust timestamps correctly and preserve WEBVTT syntax.
@@ -173,12 +430,18 @@ class GoogleGeminiTranslator:
             raise ValueError("Invalid WEBVTT file: 'WEBVTT' header not found.")
         return content[last_webvtt_index:]
 
+# Translation services by name; each factory takes the config and returns an object with translate()
+_translators = {
+    "google": GoogleTranslator,
+    "google_gemini": GoogleGeminiTranslator,
+}
+
+def register_translator(service_name, factory):
+    """Make a translation service available to get_translator, e.g. an offline stand-in"""
+    _translators[service_name] = factory
+
 def get_translator(service_name, config):
     """Factory function to get translator based on service name"""
-    if service_name == "google":
-        return GoogleTranslator(config)
-    # Add more translation services here as they're implemented
-    elif service_name == "google_gemini":
-        return GoogleGeminiTranslator(config)
-    else:
+    if service_name not in _translators:
         raise ValueError(f"Unknown translation service: {service_name}")
+    return _translators[service_name](config)
@@ -1,7 +1,47 @@
 import os
 import json
-import torch
-import torchaudio
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import TTSClipCache, report_cache_stats
+from utils.helpers import chunked
+from utils.models import ModelNotCached, load_silero
+from utils.speech_rate import SpeechRateModel
+from utils.subtitles import time_to_seconds
+from utils.tracing import span
+from utils.wav import read_wav_info
+
+# Loaded Silero models stay warm for the lifetime of the process, one per language and version
+_models = {}
+_models_lock = threading.Lock()
+
+def load_silero_model(tts_lang, model_version, models_dir=None, offline=False):
+    """Load a Silero TTS model once per process and reuse it afterwards"""
+    import torch
+
+    key = (tts_lang, model_version)
+    with _models_lock:
+        if key not in _models:
+            model = None
+            if models_dir:
+                try:
+                    # The pinned local package needs no GitHub or download round trip
+                    model = load_silero(tts_lang, model_version, models_dir)
+                except ModelNotCached:
+                    if offline:
+                        raise
+            if model is None:
+                model, _ = torch.hub.load(
+                    repo_or_dir='snakers4/silero-models',
+                    model='silero_tts',
+                    language=tts_lang,
+                    speaker=f'{model_version}_{tts_lang}'
+                )
+            model.to(torch.device('cpu'))
+            _models[key] = model
+        return _models[key]
 
 class SileroTTS:
     def __init__(self, config):
@@ -9,63 +49,347 @@ class SileroTTS:
         # Load model only when needed
         self.model = None
         self.sample_rate = config.sample_rate
+        self.model_version = getattr(config, "silero_model_version", "v3")
+        self.cache = None
+        if getattr(config, "tts_cache_enabled", False):
+            self.cache = TTSClipCache(config.tts_cache_dir, config.tts_cache_max_bytes)
+        self.rate_model = SpeechRateModel.from_config(config)
+
+    def _tts_language(self):
+        return self.config.language_tts_map.get(self.config.target_language, self.config.target_language)
         
     def _load_model(self):
         """Load Silero TTS model if not already loaded"""
+        import torch
+
         if self.model is None:
-            tts_lang = self.config.language_tts_map.get(self.config.target_language, self.config.target_language)
-            self.model, _ = torch.hub.load(
-                repo_or_dir='snakers4/silero-models',
-                model='silero_tts',
-                language=tts_lang,
-                speaker=f'v3_{tts_lang}'
+            self.model = load_silero_model(
+                self._tts_language(), self.model_version,
+                getattr(self.config, "models_dir", None), getattr(self.config, "offline_models", False)
             )
-            self.model.to(torch.device('cpu'))
+
+        num_threads = getattr(self.config, "tts_num_threads", None)
+        if num_threads:
+            torch.set_num_threads(num_threads)
     
+    def _prosody(self, subtitle):
+        """Speaking rate preset predicted to fit the subtitle into its slot"""
+        if not getattr(self.config, "speech_rate_planning", False):
+            return "medium"
+        slot = time_to_seconds(subtitle['end']) - time_to_seconds(subtitle['start'])
+        return self.rate_model.choose_prosody(
+            subtitle['text'], slot, getattr(self.config, "speech_rate_max_prosody", "x-fast")
+        )
+
+    def _ssml(self, subtitle):
+        """SSML input for a subtitle, or None when it is spoken at the normal rate"""
+        prosody = self._prosody(subtitle)
+        if prosody == "medium":
+            return None
+        text = subtitle['text'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        return f'<speak><prosody rate="{prosody}">{text}</prosody></speak>'
+
+    def _synthesize(self, subtitle, speaker):
+        """Run Silero inference for a single subtitle"""
+        with span("silero", "tts", index=subtitle['index'], chars=len(subtitle['text'])) as span_args:
+            audio = self._apply_tts(subtitle, speaker)
+            span_args["audio_seconds"] = audio.shape[-1] / self.sample_rate
+        return audio
+
+    def _apply_tts(self, subtitle, speaker):
+        ssml = self._ssml(subtitle)
+        if ssml is not None:
+            return self.model.apply_tts(
+                ssml_text=ssml,
+                sample_rate=self.sample_rate,
+                speaker=speaker,
+                put_accent=True,
+                put_yo=True
+            )
+        return self.model.apply_tts(
+            text=subtitle['text'], 
+            sample_rate=self.sample_rate, 
+            speaker=speaker, 
+            put_accent=True, 
+            put_yo=True
+        )
+
+    def _cache_key(self, subtitle, speaker):
+        return TTSClipCache.make_key(
+            self._ssml(subtitle) or subtitle['text'], speaker, self._tts_language(), self.sample_rate, self.model_version
+        )
+
+    def _restore_cached(self, subtitle, speaker):
+        """Copy a previously generated clip into place; return its sample count on a cache hit, else None"""
+        if self.cache is None:
+            return None
+        speech_path = self._speech_path(subtitle)
+        if not self.cache.get(self._cache_key(subtitle, speaker), speech_path):
+            return None
+        _, _, num_samples = read_wav_info(speech_path)
+        return num_samples
+
+    def _save_clip(self, subtitle, speaker, audio):
+        """Write a generated clip, add it to the cache and return its sample count"""
+        import torchaudio
+
+        gen_audio_path = self._speech_path(subtitle)
+        # torchaudio.save(gen_audio_path, audio.unsqueeze(0), self.sample_rate, backend="ffmpeg")
+        torchaudio.save(gen_audio_path, audio.unsqueeze(0), self.sample_rate)
+        if self.cache is not None:
+            self.cache.put(self._cache_key(subtitle, speaker), gen_audio_path)
+        return audio.shape[-1]
+
+    def _speech_path(self, subtitle):
+        return os.path.join(self.config.tts_path, f"speech_{subtitle['index']}.wav")
+
+    def _speech_entry(self, subtitle, num_samples, cached=False):
+        # The exact clip length travels with the entry so later stages never probe the file
+        return {
+            'file': self._speech_path(subtitle),
+            'start': subtitle['start'],
+            'end': subtitle['end'],
+            'text': subtitle['text'],
+            'orig_text': subtitle['orig_text'],
+            'num_samples': num_samples,
+            'sample_rate': self.sample_rate,
+            'prosody': self._prosody(subtitle),
+            'cached': cached,
+        }
+
+    def _generate_sequential(self, translated_subtitles, speaker):
+        """Synthesize and save one subtitle at a time"""
+        speech_files = []
+        for subtitle in translated_subtitles:
+            try:
+                num_samples = self._restore_cached(subtitle, speaker)
+                cached = num_samples is not None
+                if not cached:
+                    num_samples = self._save_clip(subtitle, speaker, self._synthesize(subtitle, speaker))
+                speech_files.append(self._speech_entry(subtitle, num_samples, cached))
+            except Exception as e:
+                print(f"Error generating speech for subtitle {subtitle['index']}: {e}")
+        return speech_files
+
+    def _generate_threaded(self, translated_subtitles, speaker, workers):
+        """Synthesize cues on a thread pool sharing the model while a writer thread saves WAVs"""
+        # Silero takes one text per apply_tts call, so cues run side by side rather than in padded batches
+        write_queue = queue.Queue(maxsize=4 * workers)
+        failed_writes = set()
+        clip_samples = {}
+        cached_positions = set()
+
+        def write_worker():
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    break
+                position, audio = item
+                subtitle = translated_subtitles[position]
+                try:
+                    clip_samples[position] = self._save_clip(subtitle, speaker, audio)
+                except Exception as e:
+                    print(f"Error generating speech for subtitle {subtitle['index']}: {e}")
+                    failed_writes.add(position)
+
+        def run_cue(position):
+            subtitle = translated_subtitles[position]
+            try:
+                num_samples = self._restore_cached(subtitle, speaker)
+                if num_samples is not None:
+                    clip_samples[position] = num_samples
+                    cached_positions.add(position)
+                    return True
+                audio = self._synthesize(subtitle, speaker)
+            except Exception as e:
+                print(f"Error generating speech for subtitle {subtitle['index']}: {e}")
+                return False
+            write_queue.put((position, audio))
+            return True
+
+        writer = threading.Thread(target=write_worker, daemon=True)
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                synthesized = list(pool.map(run_cue, range(len(translated_subtitles))))
+        finally:
+            write_queue.put(None)
+            writer.join()
+
+        return [
+            self._speech_entry(subtitle, clip_samples[position], position in cached_positions)
+            for position, subtitle in enumerate(translated_subtitles)
+            if synthesized[position] and position not in failed_writes
+        ]
+
+    def _speaker(self):
+        return self.config.speaker_map.get(self.config.target_language, 'random')
+
+    def generate_chunk(self, chunk):
+        """Synthesize (position, subtitle) pairs and return (position, speech entry, duration) results"""
+        self._load_model()
+        speaker = self._speaker()
+        results = []
+        for position, subtitle in chunk:
+            try:
+                num_samples = self._restore_cached(subtitle, speaker)
+                cached = num_samples is not None
+                if not cached:
+                    num_samples = self._save_clip(subtitle, speaker, self._synthesize(subtitle, speaker))
+                duration = num_samples / self.sample_rate
+                results.append((position, self._speech_entry(subtitle, num_samples, cached), duration))
+            except Exception as e:
+                print(f"Error generating speech for subtitle {subtitle['index']}: {e}")
+        return results
+
+    def save_metadata(self, speech_files):
+        """Save speech file metadata"""
+        output_meta = os.path.join(self.config.tts_path, f"silero_{self.config.target_language}_metadata.json")
+        with open(output_meta, 'w', encoding='utf-8') as f:
+            json.dump(speech_files, f, ensure_ascii=False, indent=2)
+        # Every run refines the speech rate model used to plan the next one
+        self.rate_model.update(speech_files)
+        self.rate_model.save()
+
     def generate(self, translated_subtitles):
         """Generate speech for translated subtitles"""
         try:
             self._load_model()
-            speech_files = []
             
-            speaker = self.config.speaker_map.get(self.config.target_language, 'random')
+            speaker = self._speaker()
+            workers = getattr(self.config, "tts_inference_workers", 1)
             
-            for subtitle in translated_subtitles:
-                gen_audio_path = os.path.join(self.config.tts_path, f"speech_{subtitle['index']}.wav")
-                try:
-                    audio = self.model.apply_tts(
-                        text=subtitle['text'], 
-                        sample_rate=self.sample_rate, 
-                        speaker=speaker, 
-                        put_accent=True, 
-                        put_yo=True
-                    )
-                    # torchaudio.save(gen_audio_path, audio.unsqueeze(0), self.sample_rate, backend="ffmpeg")
-                    torchaudio.save(gen_audio_path, audio.unsqueeze(0), self.sample_rate)
-                    speech_files.append({
-                        'file': gen_audio_path,
-                        'start': subtitle['start'],
-                        'end': subtitle['end'],
-                        'text': subtitle['text'],
-                        'orig_text': subtitle['orig_text'],
-                    })
-                except Exception as e:
-                    print(f"Error generating speech for subtitle {subtitle['index']}: {e}")
+            if workers > 1:
+                speech_files = self._generate_threaded(translated_subtitles, speaker, workers)
+            else:
+                speech_files = self._generate_sequential(translated_subtitles, speaker)
             
-            # Save speech file metadata
-            output_meta = os.path.join(self.config.tts_path, f"silero_{self.config.target_language}_metadata.json")
-            with open(output_meta, 'w', encoding='utf-8') as f:
-                json.dump(speech_files, f, ensure_ascii=False, indent=2)
-                
+            self.save_metadata(speech_files)
             return speech_files
         except Exception as e:
             print(f"Error loading TTS model for language '{self.config.target_language}': {e}")
             return []
 
+    def generate_stream(self, translated_subtitles):
+        """Yield speech file entries as soon as each incoming subtitle is synthesized"""
+        try:
+            self._load_model()
+        except Exception as e:
+            print(f"Error loading TTS model for language '{self.config.target_language}': {e}")
+            return
+
+        speech_files = []
+        for position, subtitle in enumerate(translated_subtitles):
+            for _, entry, _ in self.generate_chunk([(position, subtitle)]):
+                speech_files.append(entry)
+                yield entry
+        self.save_metadata(speech_files)
+
+# TTS systems by name; each factory takes the config and returns an object with generate()
+_tts_systems = {
+    "silero": SileroTTS,
+}
+
+def register_tts_system(system_name, factory):
+    """Make a TTS system available to get_tts_system, e.g. an offline stand-in"""
+    _tts_systems[system_name] = factory
+
 def get_tts_system(system_name, config):
     """Factory function to get TTS system based on name"""
-    if system_name == "silero":
-        return SileroTTS(config)
-    # Add more TTS systems here as they're implemented
-    else:
+    if system_name not in _tts_systems:
         raise ValueError(f"Unknown TTS system: {system_name}")
+    return _tts_systems[system_name](config)
+
+_worker_tts = None
+
+def _init_tts_worker(system_name, config, threads_per_worker):
+    """Create the TTS system and load its model once per pool worker"""
+    global _worker_tts
+    config.tts_num_threads = threads_per_worker
+    _worker_tts = get_tts_system(system_name, config)
+    try:
+        _worker_tts._load_model()
+    except Exception as e:
+        # A failing initializer would make the pool respawn workers forever;
+        # generate_chunk retries the load and reports the error instead
+        print(f"Error loading TTS model in worker: {e}")
+
+def _tts_worker_generate(chunk):
+    """Generate a chunk and return its results with the cache hits and misses it caused"""
+    cache = _worker_tts.cache
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    results = _worker_tts.generate_chunk(chunk)
+    if cache:
+        return results, cache.hits - hits, cache.misses - misses
+    return results, 0, 0
+
+def generate_in_process_pool(system_name, config, translated_subtitles):
+    """Generate speech across a pool of worker processes, each holding its own model"""
+    num_workers = config.tts_workers
+    threads_per_worker = config.tts_threads_per_worker
+    # Several chunks per worker so that slow chunks do not leave other workers idle
+    chunk_size = max(1, -(-len(translated_subtitles) // (num_workers * 4)))
+    indexed = list(enumerate(translated_subtitles))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+
+    results = []
+    cache_hits = cache_misses = 0
+    # Torch does not survive fork well, so workers are always spawned
+    context = multiprocessing.get_context("spawn")
+    try:
+        with context.Pool(
+            processes=num_workers,
+            initializer=_init_tts_worker,
+            initargs=(system_name, config, threads_per_worker)
+        ) as pool:
+            for chunk_results, hits, misses in pool.imap_unordered(_tts_worker_generate, chunks):
+                results.extend(chunk_results)
+                cache_hits += hits
+                cache_misses += misses
+    except Exception as e:
+        print(f"Error loading TTS model for language '{config.target_language}': {e}")
+        return []
+
+    # Reassemble in cue order
+    results.sort(key=lambda result: result[0])
+    speech_files = [entry for _, entry, _ in results]
+    total_duration = sum(duration for _, _, duration in results)
+    print(f"Generated {len(speech_files)} speech clips ({total_duration:.1f}s of audio) with {num_workers} TTS workers")
+    if getattr(config, "tts_cache_enabled", False):
+        report_cache_stats("TTS clip cache", cache_hits, cache_misses)
+
+    get_tts_system(system_name, config).save_metadata(speech_files)
+    return speech_files
+
+def generate_stream_in_process_pool(system_name, config, translated_subtitles):
+    """Feed incoming cues to a pool of worker processes and yield speech entries in cue order"""
+    chunk_size = getattr(config, "stream_chunk_size", 20)
+    speech_files = []
+    cache_hits = cache_misses = 0
+
+    def collect(async_result):
+        nonlocal cache_hits, cache_misses
+        chunk_results, hits, misses = async_result.get()
+        cache_hits += hits
+        cache_misses += misses
+        for _, entry, _ in chunk_results:
+            speech_files.append(entry)
+            yield entry
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        processes=config.tts_workers,
+        initializer=_init_tts_worker,
+        initargs=(system_name, config, config.tts_threads_per_worker)
+    ) as pool:
+        pending = deque()
+        for chunk in chunked(enumerate(translated_subtitles), chunk_size):
+            pending.append(pool.apply_async(_tts_worker_generate, (chunk,)))
+            while pending and pending[0].ready():
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
+
+    if getattr(config, "tts_cache_enabled", False):
+        report_cache_stats("TTS clip cache", cache_hits, cache_misses)
+    get_tts_system(system_name, config).save_metadata(speech_files)
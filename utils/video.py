@@ -1,9 +1,11 @@
 import os
-import subprocess
+import shutil
+import sys
+import threading
 from urllib.parse import parse_qs, urlparse
-import yt_dlp
 
-from utils.helpers import run_subprocess_with_logging
+from utils.executor import run_command
+from utils.separation import separate_demucs
 
 def get_video_id(url):
     """Extract video ID from a YouTube URL"""
@@ -14,46 +16,155 @@ def get_video_id(url):
     else:
         raise ValueError("Incorrect YouTube URL passed")
 
-def download_video_and_subtitles(config):
-    """Download a YouTube video and its subtitles"""
+# Background video downloads, keyed by the video file they produce
+_video_downloads = {}
+_video_downloads_lock = threading.Lock()
+# Video streams fetched at the same time across every run in the process
+_download_slots = threading.BoundedSemaphore(2)
+
+def _ydl_options(config, **options):
+    """yt-dlp options shared by every download: cookies, parallel fragments and resuming"""
     ydl_opts = {
-        'format': 'bestvideo+bestaudio/best',
-        'subtitleslangs': ['en.*'],
-        'subtitlesformat': 'vtt',
-        'writesubtitles': True,
-        'outtmpl': os.path.join(config.project_dir, 'video.%(ext)s')
+        'concurrent_fragment_downloads': getattr(config, "download_fragments", 8),
+        'continuedl': True,
+        'retries': 10,
+        'fragment_retries': 10,
     }
-
     if config.youtube_cookies_path:
         ydl_opts['cookies'] = config.youtube_cookies_path
+    ydl_opts.update(options)
+    return ydl_opts
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([config.youtube_url])
+def _youtube_dl(ydl_opts):
+    # yt_dlp takes a while to import, so only runs that download pay for it
+    import yt_dlp
+    return yt_dlp.YoutubeDL(ydl_opts)
 
-    # Find the subtitle file
+def _copy_subtitles(config):
+    """Copy the downloaded subtitle file to its standard location"""
     for file in os.listdir(config.project_dir):
         if file.endswith('.vtt'):
-            subtitle_file = os.path.join(config.project_dir, file)
-            # Copy to standard location
-            subprocess.run(f"cp {subtitle_file} {config.subtitle_file}", shell=True)
+            shutil.copy(os.path.join(config.project_dir, file), config.subtitle_file)
             return config.subtitle_file
     return None
 
-def extract_audio(config):
-    """Extract audio from video file"""
-    command = f"ffmpeg -i {config.video_file} -q:a 0 -map a {config.original_audio_file} -y"
-    run_subprocess_with_logging(command)
+def download_video_and_subtitles(config):
+    """Download a YouTube video and its subtitles"""
+    ydl_opts = _ydl_options(
+        config,
+        format='bestvideo+bestaudio/best',
+        subtitleslangs=['en.*'],
+        subtitlesformat='vtt',
+        writesubtitles=True,
+        outtmpl=os.path.join(config.project_dir, 'video.%(ext)s')
+    )
+
+    with _youtube_dl(ydl_opts) as ydl:
+        ydl.download([config.youtube_url])
+
+    return _copy_subtitles(config)
+
+def download_audio_and_subtitles(config):
+    """Download only the subtitles and the audio stream; return (subtitle file, audio file)"""
+    ydl_opts = _ydl_options(
+        config,
+        format='bestaudio/best',
+        subtitleslangs=['en.*'],
+        subtitlesformat='vtt',
+        writesubtitles=True,
+        outtmpl=os.path.join(config.project_dir, 'audio_source.%(ext)s')
+    )
+
+    with _youtube_dl(ydl_opts) as ydl:
+        info = ydl.extract_info(config.youtube_url, download=True)
+        audio_file = ydl.prepare_filename(info)
+
+    return _copy_subtitles(config), audio_file
+
+def _download_video_stream(config):
+    ydl_opts = _ydl_options(config, format='bestvideo/best', outtmpl=config.video_file)
+    with _youtube_dl(ydl_opts) as ydl:
+        ydl.download([config.youtube_url])
+    return config.video_file
+
+class _VideoDownload:
+    """A video stream downloading on a daemon thread, so a failed run exits without waiting for it"""
+    def __init__(self, config):
+        self.video_file = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(config,), name="video-download", daemon=True)
+        self.thread.start()
+
+    def _run(self, config):
+        try:
+            with _download_slots:
+                self.video_file = _download_video_stream(config)
+        except BaseException as e:
+            self.error = e
+
+    def failed(self):
+        return not self.thread.is_alive() and self.error is not None
+
+    def result(self):
+        """Join the download and return the video file, raising its error if it failed"""
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.video_file
+
+def start_video_download(config):
+    """Start downloading the video stream in the background; only the final mux waits for it"""
+    with _video_downloads_lock:
+        download = _video_downloads.get(config.video_file)
+        if download is None or download.failed():
+            download = _VideoDownload(config)
+            _video_downloads[config.video_file] = download
+        return download
+
+def wait_for_video(config):
+    """Block until the video stream is on disk, downloading it now if nothing started it"""
+    with _video_downloads_lock:
+        download = _video_downloads.get(config.video_file)
+    if download is not None:
+        return download.result()
+    if not os.path.exists(config.video_file) and config.youtube_url:
+        return _download_video_stream(config)
+    return config.video_file
+
+def extract_audio(config, source_file=None):
+    """Extract audio from the downloaded audio stream or the video file"""
+    command = ["ffmpeg", "-i", source_file or config.video_file, "-q:a", "0", "-map", "a", config.original_audio_file, "-y"]
+    result = run_command(command, getattr(config, "subprocess_timeout", None))
+    if not result.ok:
+        print(f"Error extracting audio: {result.describe()}")
     return config.original_audio_file
 
-def separate_audio(config):
+# Extra separators by name; each takes (config, subtitle_file) and returns (voice_file, bg_file)
+_separators = {}
+
+def register_separator(separator_name, separate):
+    """Make an audio separator available to separate_audio, e.g. an offline stand-in"""
+    _separators[separator_name] = separate
+
+def _run_separator(config, command):
+    result = run_command(command, getattr(config, "subprocess_timeout", None))
+    if not result.ok:
+        print(f"Splitting audio failed: {result.describe()}")
+
+def separate_audio(config, subtitle_file=None):
     """Separate voice from background audio using Demucs or Spleeter"""
     if os.path.exists(config.voice_file) and os.path.exists(config.bg_file):
         return config.voice_file, config.bg_file
 
-    if config.audio_separator == "demucs":
+    if config.audio_separator in _separators:
+        return _separators[config.audio_separator](config, subtitle_file)
+    elif config.audio_separator == "demucs" and getattr(config, "demucs_backend", "cli") == "inprocess":
+        return separate_demucs(config, subtitle_file)
+    elif config.audio_separator == "demucs":
         # Use Demucs for audio separation
-        command = f"python3 -m demucs.separate --two-stems=vocals --two-stems=vocals --float32 -o {config.audio_path} {config.original_audio_file}"
-        run_subprocess_with_logging(command)
+        command = [sys.executable, "-m", "demucs.separate", "--two-stems=vocals", "--float32",
+                   "-o", config.audio_path, config.original_audio_file]
+        _run_separator(config, command)
         # Rename output files to standard locations
         stems_dir = os.path.join(config.audio_path, "htdemucs", os.path.basename(config.original_audio_file).split('.')[0])
         if os.path.exists(stems_dir):
@@ -61,8 +172,8 @@ def separate_audio(config):
             os.rename(os.path.join(stems_dir, "no_vocals.wav"), config.bg_file)
     elif config.audio_separator == "spleeter":
         # Use Spleeter for audio separation
-        command = f"spleeter separate -o {config.audio_path} -p spleeter:2stems {config.original_audio_file}"
-        run_subprocess_with_logging(command)
+        command = ["spleeter", "separate", "-o", config.audio_path, "-p", "spleeter:2stems", config.original_audio_file]
+        _run_separator(config, command)
         # Rename output files to standard locations
         stems_dir = os.path.join(config.audio_path, "original_audio")
         if os.path.exists(stems_dir):
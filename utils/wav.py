@@ -0,0 +1,221 @@
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def _parse_header(f):
+    """Parse RIFF/WAVE chunks and return (format, channels, rate, bits, data_offset, data_size)"""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt_data = f.read(chunk_size)
+            audio_format, channels, rate, _, _, bits = struct.unpack("<HHIIHH", fmt_data[:16])
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt_data) >= 26:
+                # First two bytes of the sub-format GUID carry the real format tag
+                audio_format = struct.unpack("<H", fmt_data[24:26])[0]
+            fmt = (audio_format, channels, rate, bits)
+            if chunk_size % 2:
+                f.seek(1, 1)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes fmt chunk")
+            return fmt + (f.tell(), chunk_size)
+        else:
+            f.seek(chunk_size + (chunk_size % 2), 1)
+
+def _sample_dtype(audio_format, bits):
+    """Map a WAV sample format to a NumPy dtype"""
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4")
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 64:
+        return np.dtype("<f8")
+    if audio_format == WAVE_FORMAT_PCM and bits == 16:
+        return np.dtype("<i2")
+    if audio_format == WAVE_FORMAT_PCM and bits == 32:
+        return np.dtype("<i4")
+    if audio_format == WAVE_FORMAT_PCM and bits in (8, 24):
+        return None  # Handled separately
+    raise ValueError(f"Unsupported WAV sample format {audio_format} with {bits} bits")
+
+def _scale_to_float32(samples, bits):
+    """Convert float or integer PCM samples of a NumPy dtype to float32 in [-1, 1]"""
+    # np.array copies, so the result never holds on to a memory map
+    if samples.dtype.kind == "f":
+        return np.array(samples, dtype=np.float32)
+    return np.array(samples, dtype=np.float32) / float(2 ** (bits - 1))
+
+def _to_float32(raw, audio_format, bits):
+    """Convert raw sample bytes to float32 in [-1, 1]"""
+    dtype = _sample_dtype(audio_format, bits)
+    if dtype is not None:
+        return _scale_to_float32(np.frombuffer(raw, dtype=dtype), bits)
+    if bits == 8:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    # 24-bit PCM: widen each little-endian triplet to int32
+    triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+    samples = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+    samples = np.where(samples & 0x800000, samples - 0x1000000, samples)
+    return samples.astype(np.float32) / float(2 ** 23)
+
+def read_wav_info(path):
+    """Read only the WAV header and return (sample_rate, channels, num_frames)"""
+    with open(path, "rb") as f:
+        _, channels, rate, bits, data_offset, data_size = _parse_header(f)
+        # Streamed WAVs may carry a placeholder data size, so trust the file size
+        f.seek(0, 2)
+        data_size = min(data_size, f.tell() - data_offset)
+    return rate, channels, data_size // (channels * bits // 8)
+
+def wav_metadata(path):
+    """Sample count and rate of a WAV file from its header; both None when it cannot be read"""
+    try:
+        rate, _, num_frames = read_wav_info(path)
+    except (OSError, ValueError):
+        return {"num_samples": None, "sample_rate": None}
+    return {"num_samples": num_frames, "sample_rate": rate}
+
+def read_wav(path):
+    """Read a WAV file into a float32 array of shape (frames, channels) and its sample rate"""
+    with open(path, "rb") as f:
+        audio_format, channels, rate, bits, _, data_size = _parse_header(f)
+        raw = f.read(data_size)
+
+    frame_size = channels * bits // 8
+    raw = raw[:len(raw) - len(raw) % frame_size]
+    samples = _to_float32(raw, audio_format, bits)
+    return samples.reshape(-1, channels), rate
+
+def to_mono(samples):
+    """Downmix a (frames, channels) array to a 1-D float32 array"""
+    if samples.ndim == 1:
+        return samples.astype(np.float32, copy=False)
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+def resample(samples, from_rate, to_rate):
+    """Linearly resample a 1-D signal"""
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    out_length = int(round(len(samples) * to_rate / from_rate))
+    positions = np.arange(out_length, dtype=np.float64) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def _float_wav_header(frames, channels, sample_rate):
+    """Build the header of an IEEE float32 WAV file holding the given number of frames"""
+    data_size = frames * channels * 4
+    return (
+        struct.pack("<4sI4s", b"RIFF", 4 + 26 + 12 + 8 + data_size, b"WAVE")
+        + struct.pack("<4sIHHIIHHH", b"fmt ", 18, WAVE_FORMAT_IEEE_FLOAT, channels,
+                      sample_rate, sample_rate * channels * 4, channels * 4, 32, 0)
+        + struct.pack("<4sII", b"fact", 4, frames)
+        + struct.pack("<4sI", b"data", data_size)
+    )
+
+def _pcm16_wav_header(frames, channels, sample_rate):
+    """Build the header of a 16-bit PCM WAV file holding the given number of frames"""
+    data_size = frames * channels * 2
+    return (
+        struct.pack("<4sI4s", b"RIFF", 4 + 24 + 8 + data_size, b"WAVE")
+        + struct.pack("<4sIHHIIHH", b"fmt ", 16, WAVE_FORMAT_PCM, channels,
+                      sample_rate, sample_rate * channels * 2, channels * 2, 16)
+        + struct.pack("<4sI", b"data", data_size)
+    )
+
+def write_wav(path, samples, sample_rate):
+    """Write a float32 array of shape (frames,) or (frames, channels) as an IEEE float WAV file"""
+    samples = np.asarray(samples, dtype="<f4")
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    frames, channels = samples.shape
+
+    with open(path, "wb") as f:
+        f.write(_float_wav_header(frames, channels, sample_rate))
+        f.write(np.ascontiguousarray(samples).tobytes())
+    return path
+
+class WavReader:
+    """Random access to the frames of a WAV file without loading it into memory"""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        (self._format, self.channels, self.sample_rate, self._bits,
+         self._data_offset, data_size) = _parse_header(self._file)
+        self._frame_size = self.channels * self._bits // 8
+        self._dtype = _sample_dtype(self._format, self._bits)
+        self._file.seek(0, 2)
+        data_size = min(data_size, self._file.tell() - self._data_offset)
+        self.num_frames = data_size // self._frame_size
+
+    def read(self, start, count):
+        """Return up to count frames from start as a float32 array of shape (frames, channels)"""
+        count = max(0, min(count, self.num_frames - start))
+        if count == 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        if self._dtype is not None:
+            # Each read maps only its own frames, so pages of earlier blocks do not stay resident
+            frames = np.memmap(self._file, dtype=self._dtype, mode="r",
+                               offset=self._data_offset + start * self._frame_size, shape=(count, self.channels))
+            return _scale_to_float32(frames, self._bits)
+        self._file.seek(self._data_offset + start * self._frame_size)
+        raw = self._file.read(count * self._frame_size)
+        return _to_float32(raw, self._format, self._bits).reshape(-1, self.channels)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class WavWriter:
+    """Append float32 frames to a WAV file, filling in the header sizes on close.
+
+    The file stores IEEE float32 samples, or clipped 16-bit PCM at half the size when bits is 16.
+    """
+    def __init__(self, path, sample_rate, channels, bits=32):
+        if bits not in (16, 32):
+            raise ValueError(f"Unsupported WAV sample size: {bits} bits")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bits = bits
+        self.num_frames = 0
+        self._header = _pcm16_wav_header if bits == 16 else _float_wav_header
+        self._file = open(path, "wb")
+        self._file.write(self._header(0, channels, sample_rate))
+
+    def write(self, samples):
+        """Append a (frames, channels) or (frames,) array"""
+        samples = np.asarray(samples, dtype="<f4")
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if self.bits == 16:
+            samples = np.round(np.clip(samples, -1.0, 32767 / 32768) * 32768).astype("<i2")
+        self._file.write(np.ascontiguousarray(samples).tobytes())
+        self.num_frames += len(samples)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._header(self.num_frames, self.channels, self.sample_rate))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()